@@ -1,9 +1,113 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.permissions import SAFE_METHODS
 
 
-class SafeTokenAuthentication(TokenAuthentication):
+class TokenCache:
+    """
+    Per-process LRU of resolved tokens (key -> user, token) with a TTL.
+
+    Entries are evicted on logout (token deleted) and whenever the user is saved or deleted
+    (see api/signals.py). Those signals only reach the current process, so with several
+    workers a deactivated user may keep access on the others for up to AUTH_TOKEN_CACHE_TTL
+    seconds.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            user, token = entry[1], entry[2]
+        # Copies so that a request mutating request.user doesn't leak into the next one
+        return copy.copy(user), copy.copy(token)
+
+    def set(self, key, user, token):
+        size, ttl = settings.AUTH_TOKEN_CACHE_SIZE, settings.AUTH_TOKEN_CACHE_TTL
+        if size <= 0 or ttl <= 0:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, copy.copy(user), copy.copy(token))
+            self._keys_by_user.setdefault(user.pk, set()).add(key)
+            while len(self._entries) > size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            keys = self._keys_by_user.get(entry[1].pk)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_user[entry[1].pk]
+
+    def invalidate_key(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': settings.AUTH_TOKEN_CACHE_SIZE,
+                'ttl': settings.AUTH_TOKEN_CACHE_TTL,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / total, 4) if total else None,
+            }
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that resolves valid tokens from token_cache before querying Token + User."""
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is not None:
+            return cached
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, user, token)
+        return user, token
+
+
+class SafeTokenAuthentication(CachedTokenAuthentication):
     """
     Token auth that does NOT raise 401 on invalid/malformed tokens for safe (read-only) methods.
     This allows public GET endpoints to work even if the client sends a bad Authorization header.
@@ -0,0 +1,144 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework.exceptions import NotAcceptable
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from .auth_backends import token_cache
+
+# Nombres de endpoints cacheados ('HeroSectionViewSet.active', ...) para reportar contadores
+CACHED_ENDPOINTS = set()
+
+
+def _generation_key(model):
+    return f'api-cache:gen:{model._meta.label_lower}'
+
+
+def bump_generation(sender, **kwargs):
+    """Invalidar todas las respuestas que dependen del modelo que cambió."""
+    cache.set(_generation_key(sender), time.time_ns(), None)
+
+
+def _count(endpoint, outcome):
+    key = f'api-cache:stats:{endpoint}:{outcome}'
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+class CachedResponseMixin:
+    """
+    Cachea las respuestas GET de acciones públicas de solo lectura.
+
+    La llave incluye endpoint, host, parámetros de query, el formato que elige la
+    negociación de contenido (JSON o la API navegable en HTML) y el tipo de autenticación
+    enviado (anónimo, token o sesión). Las respuestas cacheadas se sirven antes de
+    autenticar, por lo que solo deben usarse en acciones con AllowAny. Cada respuesta
+    queda asociada a la "generación" de los modelos en cache_models; al guardar o
+    borrar cualquiera de ellos se cambia la generación y las respuestas viejas dejan
+    de encontrarse.
+    """
+    cache_actions = ['list', 'retrieve']
+    cache_models = []
+    cache_timeout = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for action in cls.cache_actions:
+            CACHED_ENDPOINTS.add(f'{cls.__name__}.{action}')
+        for model in cls.cache_models:
+            post_save.connect(bump_generation, sender=model, dispatch_uid=f'api-cache-{model._meta.label_lower}-save')
+            post_delete.connect(bump_generation, sender=model, dispatch_uid=f'api-cache-{model._meta.label_lower}-delete')
+
+    def get_auth_kind(self, request):
+        authorization = request.META.get('HTTP_AUTHORIZATION', '')
+        if authorization:
+            return authorization.split(' ', 1)[0].lower()
+        if settings.SESSION_COOKIE_NAME in request.COOKIES:
+            return 'session'
+        return 'anon'
+
+    def get_renderer_format(self, request, **kwargs):
+        """Formato del renderer que elegiría DRF para este Accept/?format=, o None si ninguno sirve."""
+        self.format_kwarg = self.get_format_suffix(**kwargs)
+        try:
+            renderer, _ = self.perform_content_negotiation(self.initialize_request(request, **kwargs))
+        except NotAcceptable:
+            return None
+        return renderer.format
+
+    def get_response_cache_key(self, request, action, renderer_format, **kwargs):
+        generation_keys = [_generation_key(model) for model in self.cache_models]
+        generations = cache.get_many(generation_keys)
+        parts = [
+            self.__class__.__name__,
+            action,
+            request.get_host(),
+            self.get_auth_kind(request),
+            renderer_format,
+            repr(sorted(kwargs.items())),
+            repr(sorted(request.GET.lists())),
+            repr([generations.get(key, 0) for key in generation_keys]),
+        ]
+        return 'api-cache:response:' + hashlib.sha256('|'.join(parts).encode()).hexdigest()
+
+    def dispatch(self, request, *args, **kwargs):
+        # self.action todavía no existe aquí (DRF lo asigna en initialize_request)
+        action = self.action_map.get('get')
+        if request.method != 'GET' or action not in self.cache_actions:
+            return super().dispatch(request, *args, **kwargs)
+
+        renderer_format = self.get_renderer_format(request, **kwargs)
+        if renderer_format is None:
+            # DRF responde 406; no hay nada que cachear
+            return super().dispatch(request, *args, **kwargs)
+
+        endpoint = f'{self.__class__.__name__}.{action}'
+        key = self.get_response_cache_key(request, action, renderer_format, **kwargs)
+        cached = cache.get(key)
+        if cached is not None:
+            _count(endpoint, 'hit')
+            content, content_type, status_code = cached
+            response = HttpResponse(content, content_type=content_type, status=status_code)
+            patch_vary_headers(response, ['Accept'])
+            response['X-Cache'] = 'HIT'
+            return response
+
+        _count(endpoint, 'miss')
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200:
+            response.render()
+            timeout = self.cache_timeout if self.cache_timeout is not None else settings.API_CACHE_TIMEOUT
+            cache.set(key, (response.content, response['Content-Type'], response.status_code), timeout)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def cache_stats(request):
+    """Aciertos y fallos del cache de respuestas por endpoint y del cache de tokens."""
+    endpoints = sorted(CACHED_ENDPOINTS)
+    keys = [f'api-cache:stats:{endpoint}:{outcome}' for endpoint in endpoints for outcome in ('hit', 'miss')]
+    values = cache.get_many(keys)
+    stats = {}
+    for endpoint in endpoints:
+        hits = values.get(f'api-cache:stats:{endpoint}:hit', 0)
+        misses = values.get(f'api-cache:stats:{endpoint}:miss', 0)
+        total = hits + misses
+        stats[endpoint] = {'hits': hits, 'misses': misses, 'hit_rate': round(hits / total, 4) if total else None}
+    return Response({
+        'backend': settings.CACHES['default']['BACKEND'],
+        'endpoints': stats,
+        # Por proceso: solo el worker que atendió esta consulta
+        'token_auth': token_cache.stats(),
+    })
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Prefetch, Q
+
+from products.models import Category, ProductIngredient
+
+PRODUCT_COUNTS_CACHE_KEY = 'catalog:category-product-counts'
+
+
+def with_product_relations(queryset):
+    """Cargar categoría, tags e ingredientes que anida ProductSerializer en un número fijo de consultas."""
+    return queryset.select_related('category').prefetch_related(
+        'tags',
+        Prefetch('product_ingredients', queryset=ProductIngredient.objects.select_related('ingredient')),
+    )
+
+
+def annotate_products_count(queryset):
+    """Agregar a cada categoría la cantidad de productos activos en la misma consulta SQL."""
+    return queryset.annotate(products_count=Count('products', filter=Q(products__is_active=True)))
+
+
+def active_product_counts():
+    """
+    Mapa {category_id: productos activos}, cacheado hasta el próximo cambio de productos. La
+    invalidación por señales solo llega al cache del worker que escribió (con locmem cada proceso
+    tiene el suyo): los demás lo ven a más tardar tras API_CACHE_TIMEOUT.
+    """
+    counts = cache.get(PRODUCT_COUNTS_CACHE_KEY)
+    if counts is None:
+        counts = dict(annotate_products_count(Category.objects.all()).values_list('id', 'products_count'))
+        cache.set(PRODUCT_COUNTS_CACHE_KEY, counts, settings.API_CACHE_TIMEOUT)
+    return counts
+
+
+def invalidate_product_counts():
+    cache.delete(PRODUCT_COUNTS_CACHE_KEY)
@@ -0,0 +1,199 @@
+"""
+Eventos de pedidos en vivo (Server-Sent Events).
+
+Al crear un pedido o cambiar su estado se publica un evento en el canal de cocina
+('kitchen') y en el del dueño del pedido ('user:<id>'). GET /api/orders/events/ mantiene
+la conexión abierta y reenvía los eventos de los canales del usuario: staff recibe
+cocina, el resto solo sus pedidos.
+
+El broker es intercambiable (settings.ORDER_EVENTS_BROKER, ruta a una clase con la
+interfaz de Broker). InProcessBroker reparte los eventos dentro del mismo proceso, así
+que con varios workers se necesita un broker compartido (p.ej. Redis pub/sub) que
+implemente la misma interfaz. El stream requiere servir la app por ASGI
+(fastfood/asgi.py, p.ej. `uvicorn fastfood.asgi:application`).
+"""
+import asyncio
+import json
+import logging
+import threading
+from abc import ABC, abstractmethod
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.module_loading import import_string
+from rest_framework.request import Request
+
+from .auth_backends import SafeTokenAuthentication
+
+logger = logging.getLogger(__name__)
+
+KITCHEN_CHANNEL = 'kitchen'
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+class Broker(ABC):
+    """
+    Interfaz de pub/sub: publish se llama desde código sync, subscribe desde el stream async.
+    Un broker que no implementa ambos métodos falla al instanciarse (get_broker), no al usarse.
+    """
+
+    @abstractmethod
+    def publish(self, channel, event):
+        pass
+
+    @abstractmethod
+    def subscribe(self, channels):
+        """Devuelve una suscripción con `async get(timeout)` (None si vence) y `close()`."""
+
+
+class _Subscription:
+    def __init__(self, broker, channels, max_pending):
+        self.broker = broker
+        self.channels = channels
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_pending)
+
+    def deliver(self, event):
+        # Se ejecuta en el loop del suscriptor; si el cliente no consume, se descartan eventos
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            logger.warning('Suscriptor lento en %s: evento descartado', ','.join(self.channels))
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker._unsubscribe(self)
+
+
+class InProcessBroker(Broker):
+    """Pub/sub en memoria del proceso: una cola asyncio por conexión abierta."""
+    max_pending = 100
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # Loop ya cerrado: la conexión terminó sin cerrar la suscripción
+                self._unsubscribe(subscription)
+
+    def subscribe(self, channels):
+        subscription = _Subscription(self, list(channels), self.max_pending)
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.ORDER_EVENTS_BROKER)()
+    return _broker
+
+
+def order_event(order, event_type):
+    return {
+        'type': event_type,
+        'order': {
+            'id': order.id,
+            'order_number': order.order_number,
+            'status': order.status,
+            'customer_name': order.customer_name,
+            'total_amount': float(order.total_amount),
+            'created_at': order.created_at,
+            'updated_at': order.updated_at,
+        },
+    }
+
+
+def publish_order_event(order, event_type):
+    """Publicar al confirmar la transacción, para que el cliente que reacciona ya vea el pedido."""
+    event = order_event(order, event_type)
+    channels = [KITCHEN_CHANNEL]
+    if order.user_id:
+        channels.append(user_channel(order.user_id))
+
+    def send():
+        broker = get_broker()
+        for channel in channels:
+            broker.publish(channel, event)
+
+    transaction.on_commit(send)
+
+
+def format_sse(event):
+    data = json.dumps(event, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return f"event: {event['type']}\ndata: {data}\n\n"
+
+
+@sync_to_async
+def _authenticate(request):
+    """Usuario por token (header Authorization) o sesión; None si es anónimo."""
+    drf_request = Request(request, authenticators=[SafeTokenAuthentication()])
+    user = drf_request.user
+    if not user or not user.is_authenticated:
+        user = request.user if request.user.is_authenticated else None
+    return user
+
+
+async def _event_stream(subscription):
+    try:
+        # Clientes EventSource reintentan a los 3s si se corta la conexión
+        yield 'retry: 3000\n\n'
+        while True:
+            event = await subscription.get(timeout=settings.ORDER_EVENTS_KEEPALIVE)
+            # Comentario SSE como keepalive para que proxies no cierren la conexión inactiva
+            yield ': keepalive\n\n' if event is None else format_sse(event)
+    finally:
+        subscription.close()
+
+
+async def order_events(request):
+    """Stream SSE con los eventos de pedidos visibles para el usuario."""
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'El stream de eventos requiere servidor ASGI'}, status=501)
+    user = await _authenticate(request)
+    if user is None:
+        return JsonResponse({'detail': 'Las credenciales de autenticación no se proveyeron.'}, status=401)
+
+    channels = [KITCHEN_CHANNEL] if user.is_staff else [user_channel(user.id)]
+    subscription = get_broker().subscribe(channels)
+    response = StreamingHttpResponse(_event_stream(subscription), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Evitar que nginx acumule el stream en su buffer
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,148 @@
+"""
+Exportación de pedidos para contabilidad: una fila por item de pedido con los datos del
+pedido y sus extras, en CSV o NDJSON. Las filas se leen con iterator(chunk_size=...) y se
+escriben por bloques, así la memoria usada no depende de cuántos pedidos se exporten.
+"""
+import csv
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import Order, OrderItem, OrderItemExtra
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+CHUNK_SIZE = 2000
+
+COLUMNS = [
+    'order_number', 'created_at', 'status', 'customer_name', 'customer_email', 'customer_phone',
+    'delivery_city', 'delivery_region', 'order_total',
+    'product_name', 'quantity', 'unit_price', 'item_total', 'extras', 'extras_total',
+]
+
+
+def parse_day(value):
+    """'YYYY-MM-DD' (hora local) -> datetime aware al inicio del día. ValueError si es inválida."""
+    try:
+        day = datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f'Fecha inválida: {value} (usar YYYY-MM-DD)')
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def parse_range(since=None, until=None):
+    """
+    (start, end) para export_queryset desde fechas locales 'YYYY-MM-DD' con ambos días incluidos,
+    igual que ?since=&until= del dashboard: end es el inicio del día siguiente a until.
+    """
+    start = parse_day(since) if since else None
+    end = parse_day(until) + timedelta(days=1) if until else None
+    if start is not None and end is not None and start >= end:
+        raise ValueError('since debe ser anterior o igual a until')
+    return start, end
+
+
+def parse_statuses(value):
+    """'pending,delivered' -> ['pending', 'delivered']. ValueError si algún estado no existe."""
+    statuses = [status.strip() for status in (value or '').split(',') if status.strip()]
+    valid = {key for key, _ in Order.STATUS_CHOICES}
+    unknown = [status for status in statuses if status not in valid]
+    if unknown:
+        raise ValueError(f'Estado inválido: {", ".join(unknown)}')
+    return statuses
+
+
+# Columnas leídas de la base (en el orden de COLUMNS, sin extras), precedidas por el id del item
+ITEM_FIELDS = (
+    'id', 'order__order_number', 'order__created_at', 'order__status', 'order__customer_name',
+    'order__customer_email', 'order__customer_phone', 'order__delivery_city', 'order__delivery_region',
+    'order__total_amount', 'product_name', 'quantity', 'unit_price', 'total_price',
+)
+
+
+def export_queryset(start=None, end=None, statuses=None, using=None):
+    """Tuplas ITEM_FIELDS de los items de pedidos creados en [start, end) con los estados dados."""
+    items = OrderItem.objects.using(using)
+    if start is not None:
+        items = items.filter(order__created_at__gte=start)
+    if end is not None:
+        items = items.filter(order__created_at__lt=end)
+    if statuses:
+        items = items.filter(order__status__in=statuses)
+    # values_list evita instanciar modelos: en exportaciones grandes es la mayor parte del costo
+    return items.order_by('order__created_at', 'order_id', 'id').values_list(*ITEM_FIELDS)
+
+
+def _extras_by_item(item_ids, using=None):
+    extras = {}
+    rows = (
+        OrderItemExtra.objects.using(using).filter(order_item_id__in=item_ids).order_by('id')
+        .values_list('order_item_id', 'ingredient_name', 'quantity', 'total_price')
+    )
+    for item_id, name, quantity, total in rows:
+        extras.setdefault(item_id, []).append({'name': name, 'quantity': quantity, 'total': total})
+    return extras
+
+
+def iter_rows(queryset, chunk_size=CHUNK_SIZE):
+    """Un dict por item; los extras se leen con una consulta por bloque de chunk_size items."""
+    tz = timezone.get_current_timezone()
+    names = COLUMNS[:COLUMNS.index('extras')]
+    items = queryset.iterator(chunk_size=chunk_size)
+    while True:
+        batch = list(islice(items, chunk_size))
+        if not batch:
+            return
+        extras = _extras_by_item([values[0] for values in batch], using=queryset.db)
+        for values in batch:
+            row = dict(zip(names, values[1:]))
+            row['created_at'] = row['created_at'].astimezone(tz)
+            row['extras'] = extras.get(values[0], [])
+            row['extras_total'] = sum((extra['total'] for extra in row['extras']), Decimal('0.00'))
+            yield row
+
+
+class _Buffer:
+    """Pseudo-archivo para csv.writer: acumula lo escrito hasta que se vacía."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, value):
+        self.parts.append(value)
+
+    def flush(self):
+        content = ''.join(self.parts)
+        self.parts = []
+        return content
+
+
+def iter_csv(rows, block_size=500):
+    buffer = _Buffer()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for i, row in enumerate(rows, 1):
+        extras = '; '.join(f"{extra['name']} x{extra['quantity']}" for extra in row['extras'])
+        writer.writerow([extras if column == 'extras' else row[column] for column in COLUMNS])
+        if i % block_size == 0:
+            yield buffer.flush()
+    yield buffer.flush()
+
+
+def iter_ndjson(rows, block_size=500):
+    encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    lines = []
+    for row in rows:
+        lines.append(encoder.encode(row) + '\n')
+        if len(lines) == block_size:
+            yield ''.join(lines)
+            lines = []
+    yield ''.join(lines)
+
+
+def export_orders(export_format, start=None, end=None, statuses=None, chunk_size=CHUNK_SIZE, using=None):
+    """Generador de bloques de texto con la exportación en el formato pedido."""
+    rows = iter_rows(export_queryset(start, end, statuses, using), chunk_size=chunk_size)
+    return iter_csv(rows) if export_format == 'csv' else iter_ndjson(rows)
@@ -0,0 +1,221 @@
+"""
+Serialización rápida para listados grandes (productos, pedidos, reseñas).
+
+Construye los mismos dicts que ProductSerializer, OrderSerializer/OrderSummarySerializer y
+ReviewSerializer directamente desde las instancias ya precargadas, sin la maquinaria de
+campos de DRF, y arma las URLs de imágenes con el origen del request calculado una vez.
+El JSON resultante es idéntico byte a byte al de los serializers de DRF (ver
+FastSerializerGoldenTests); al cambiar los campos de un serializer hay que cambiar
+también su versión aquí. Se activa con settings.API_FAST_SERIALIZERS.
+"""
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.utils.encoding import filepath_to_uri
+from django.utils import timezone
+from rest_framework.response import Response
+
+from .images import image_srcset
+from .serializers import ProductSerializer, OrderSerializer, OrderSummarySerializer, ReviewSerializer
+
+
+class _Context:
+    """Valores por request que DRF recalcula en cada fila."""
+
+    def __init__(self, request):
+        self.tz = timezone.get_current_timezone()
+        self.request = request
+        # Esquema y host para armar URLs absolutas sin pasar por build_absolute_uri en cada fila
+        self.origin = request.build_absolute_uri('/')[:-1] if request is not None else None
+        # Con FileSystemStorage la URL es MEDIA_URL + ruta escapada (storage.url usa urljoin, más lento)
+        base_url = getattr(default_storage, 'base_url', None)
+        plain_url = type(default_storage._wrapped).url is FileSystemStorage.url
+        self.media_prefix = base_url if isinstance(default_storage._wrapped, FileSystemStorage) and plain_url and base_url else None
+
+    def datetime(self, value):
+        # Igual que DateTimeField.to_representation con DATETIME_FORMAT ISO 8601
+        if not value:
+            return None
+        value = value.astimezone(self.tz).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+
+    def file_url(self, file):
+        # FileField.to_representation: URL absoluta si hay request
+        if not file:
+            return None
+        if self.media_prefix is not None:
+            url = self.media_prefix + filepath_to_uri(file.name).lstrip('/')
+        else:
+            url = default_storage.url(file.name)
+        if self.request is None:
+            return url
+        # Caso común (ruta relativa al host ya escapada): mismo resultado que build_absolute_uri
+        if url.startswith('/') and not url.startswith('//') and '/./' not in url and '/../' not in url:
+            return self.origin + url
+        return self.request.build_absolute_uri(url)
+
+
+def _related(instance, name):
+    """Filas precargadas de una relación sin construir el related manager (costoso por fila)."""
+    cache = getattr(instance, '_prefetched_objects_cache', {})
+    if name in cache:
+        return cache[name]
+    return getattr(instance, name).all()
+
+
+def _product(product, ctx):
+    category = product.category
+    image_url = ctx.file_url(product.image)
+    return {
+        'id': product.id,
+        'name': product.name,
+        'description': product.description,
+        'price': product.price,
+        'category': product.category_id,
+        'category_name': category.name,
+        'category_icon': category.icon,
+        'image': image_url,
+        # get_image_url devuelve None sin request, aunque `image` tenga la URL relativa
+        'image_url': image_url if ctx.request is not None else None,
+        'image_srcset': image_srcset(product.image, product.image_variants, ctx.request),
+        'is_active': product.is_active,
+        'tags': [{'id': tag.id, 'name': tag.name} for tag in _related(product, 'tags')],
+        'product_ingredients': [
+            {
+                'id': pi.id,
+                'ingredient': {'id': pi.ingredient.id, 'name': pi.ingredient.name, 'is_active': pi.ingredient.is_active},
+                'default_included': pi.default_included,
+                'extra_cost': pi.extra_cost,
+                'is_active': pi.is_active,
+            }
+            for pi in _related(product, 'product_ingredients')
+        ],
+        'created_at': ctx.datetime(product.created_at),
+        'updated_at': ctx.datetime(product.updated_at),
+    }
+
+
+def serialize_products(products, request):
+    ctx = _Context(request)
+    return [_product(product, ctx) for product in products]
+
+
+def _order_item(item, summary):
+    data = {
+        'id': item.id,
+        'product': item.product_id,
+        'product_name': item.product_name,
+    }
+    if not summary:
+        data['product_description'] = item.product_description
+    data.update({
+        'quantity': item.quantity,
+        'unit_price': item.unit_price,
+        'total_price': item.total_price,
+        'extras': [
+            {
+                'id': extra.id,
+                'ingredient': extra.ingredient_id,
+                'ingredient_name': extra.ingredient_name,
+                'quantity': extra.quantity,
+                'unit_price': extra.unit_price,
+                'total_price': extra.total_price,
+            }
+            for extra in _related(item, 'extras')
+        ],
+    })
+    if not summary:
+        data['ingredients'] = [
+            {
+                'id': ing.id,
+                'ingredient': ing.ingredient_id,
+                'ingredient_name': ing.ingredient_name,
+                'is_included': ing.is_included,
+                'was_default': ing.was_default,
+            }
+            for ing in _related(item, 'ingredients')
+        ]
+    return data
+
+
+def _order(order, ctx, summary):
+    return {
+        'id': order.id,
+        'order_number': order.order_number,
+        'customer_name': order.customer_name,
+        'customer_email': order.customer_email,
+        'customer_phone': order.customer_phone,
+        'delivery_address': order.delivery_address,
+        'delivery_street': order.delivery_street,
+        'delivery_number': order.delivery_number,
+        'delivery_apartment': order.delivery_apartment,
+        'delivery_city': order.delivery_city,
+        'delivery_region': order.delivery_region,
+        'notes': order.notes,
+        'status': order.status,
+        'total_amount': order.total_amount,
+        'created_at': ctx.datetime(order.created_at),
+        'updated_at': ctx.datetime(order.updated_at),
+        'items': [_order_item(item, summary) for item in _related(order, 'items')],
+    }
+
+
+def serialize_orders(orders, request):
+    ctx = _Context(request)
+    return [_order(order, ctx, summary=False) for order in orders]
+
+
+def serialize_order_summaries(orders, request):
+    ctx = _Context(request)
+    return [_order(order, ctx, summary=True) for order in orders]
+
+
+def _username(user):
+    # Igual que ReviewSerializer.get_username
+    if user and user.username:
+        return f"{user.username[0].upper()}."
+    return 'Anónimo'
+
+
+def serialize_reviews(reviews, request):
+    ctx = _Context(request)
+    return [
+        {
+            'id': review.id,
+            'username': _username(review.user),
+            'rating': review.rating,
+            'comment': review.comment,
+            'created_at': ctx.datetime(review.created_at),
+            'is_visible': review.is_visible,
+        }
+        for review in reviews
+    ]
+
+
+FAST_SERIALIZERS = {
+    ProductSerializer: serialize_products,
+    OrderSerializer: serialize_orders,
+    OrderSummarySerializer: serialize_order_summaries,
+    ReviewSerializer: serialize_reviews,
+}
+
+
+def serialize_many(serializer_class, instances, context):
+    """Datos de `serializer_class(instances, many=True)`, por la vía rápida si está activa y existe."""
+    fast = FAST_SERIALIZERS.get(serializer_class) if settings.API_FAST_SERIALIZERS else None
+    if fast is None:
+        return serializer_class(instances, many=True, context=context).data
+    return fast(instances, context.get('request'))
+
+
+class FastListMixin:
+    """list() de ModelViewSet usando serialize_many (respeta filtros y paginación)."""
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer_class = self.get_serializer_class()
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serialize_many(serializer_class, page, self.get_serializer_context()))
+        return Response(serialize_many(serializer_class, queryset, self.get_serializer_context()))
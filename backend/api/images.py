@@ -0,0 +1,150 @@
+"""
+Versiones reducidas de las imágenes subidas (WebP y JPEG), para servir `srcset`.
+
+Al guardar un modelo con imagen nueva se encola la generación en un worker de fondo.
+Cada versión se guarda junto al original ('products/papas.jpg' -> 'products/papas.card.webp',
+o con el hash de contenido que agregue el storage) y el campo `<campo>_variants` del modelo
+registra para qué archivo se generaron, con qué anchos y con qué nombres quedaron guardadas,
+así los serializers arman el srcset sin consultar el disco. Si el worker se
+pierde (reinicio del proceso), `manage.py build_image_variants` completa las faltantes.
+"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Ancho máximo de cada variante
+VARIANT_WIDTHS = {'thumb': 200, 'card': 480, 'hero': 1600}
+FORMATS = {'webp': ('WEBP', {'quality': 80, 'method': 4}), 'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True})}
+
+# (app.Modelo, campo de imagen) -> variantes que se generan
+IMAGE_FIELDS = {
+    ('products.Product', 'image'): ['thumb', 'card'],
+    ('api.FeaturedProduct', 'image'): ['card', 'hero'],
+    ('api.HeroSection', 'background_image'): ['card', 'hero'],
+    ('api.AboutSection', 'image_1'): ['thumb', 'card'],
+    ('api.AboutSection', 'image_2'): ['thumb', 'card'],
+}
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='image-variants')
+
+
+def variants_field(field_name):
+    return f'{field_name}_variants'
+
+
+def variant_name(name, variant, extension):
+    root, _ = os.path.splitext(name)
+    return f'{root}.{variant}.{extension}'
+
+
+def render_variants(name, variants):
+    """
+    Crear las variantes de `name` en el storage. Devuelve ({variante: ancho real},
+    {variante: {formato: nombre guardado}}): el storage puede cambiar el nombre pedido.
+    """
+    with default_storage.open(name, 'rb') as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image.load()
+
+    widths = {}
+    files = {}
+    for variant in variants:
+        target = VARIANT_WIDTHS[variant]
+        # Sin ampliar: si el original es más angosto, la variante queda de su ancho
+        resized = image.copy()
+        if resized.width > target:
+            resized.thumbnail((target, target * 10), Image.LANCZOS)
+        for extension, (pil_format, options) in FORMATS.items():
+            frame = resized
+            if pil_format == 'JPEG' and frame.mode not in ('RGB', 'L'):
+                # JPEG no tiene transparencia: fondo blanco
+                background = Image.new('RGB', frame.size, 'white')
+                background.paste(frame.convert('RGBA'), mask=frame.convert('RGBA').getchannel('A'))
+                frame = background
+            elif pil_format == 'WEBP' and frame.mode not in ('RGB', 'RGBA'):
+                frame = frame.convert('RGBA' if 'A' in frame.getbands() or frame.mode == 'P' else 'RGB')
+            buffer = BytesIO()
+            frame.save(buffer, pil_format, **options)
+            target_name = variant_name(name, variant, extension)
+            if default_storage.exists(target_name):
+                default_storage.delete(target_name)
+            saved_name = default_storage.save(target_name, ContentFile(buffer.getvalue()))
+            files.setdefault(variant, {})[extension] = saved_name
+        widths[variant] = resized.width
+    return widths, files
+
+
+def build_variants(model_label, pk, field_name):
+    """Generar las variantes del archivo actual del campo y registrarlas en el modelo."""
+    model = apps.get_model(model_label)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return
+    file = getattr(instance, field_name)
+    if not file:
+        return
+    try:
+        widths, files = render_variants(file.name, IMAGE_FIELDS[(model_label, field_name)])
+    except (OSError, Image.DecompressionBombError):
+        logger.exception('No se pudieron generar variantes de %s', file.name)
+        return
+    # Solo si la imagen no cambió mientras se procesaba
+    if model.objects.filter(pk=pk, **{field_name: file.name}).exists():
+        setattr(instance, variants_field(field_name), {'source': file.name, 'widths': widths, 'files': files})
+        # save() (no update()) para que las señales invaliden caches y snapshot del menú
+        instance.save(update_fields=[variants_field(field_name)])
+
+
+def _run_in_worker(model_label, pk, field_name):
+    try:
+        build_variants(model_label, pk, field_name)
+    finally:
+        close_old_connections()
+
+
+def needs_variants(instance, field_name):
+    file = getattr(instance, field_name)
+    variants = getattr(instance, variants_field(field_name)) or {}
+    return bool(file) and variants.get('source') != file.name
+
+
+def schedule_variants(instance, model_label, field_name):
+    """Encolar la generación al confirmar la transacción (en el worker o en línea según settings)."""
+    args = (model_label, instance.pk, field_name)
+    if settings.IMAGE_VARIANTS_ASYNC:
+        transaction.on_commit(lambda: _executor.submit(_run_in_worker, *args))
+    else:
+        transaction.on_commit(lambda: build_variants(*args))
+
+
+def image_srcset(file, variants, request):
+    """{'webp': 'url 200w, url 480w', 'jpeg': ...} de las variantes vigentes, o None si aún no existen."""
+    if not file or not variants or variants.get('source') != file.name:
+        return None
+    srcset = {}
+    for extension in FORMATS:
+        entries = []
+        seen = set()
+        for variant, width in variants['widths'].items():
+            # Con originales chicos varias variantes quedan del mismo ancho: una por descriptor
+            if width in seen:
+                continue
+            seen.add(width)
+            # Registros anteriores a 'files': el nombre pedido sin cambios
+            name = variants.get('files', {}).get(variant, {}).get(extension) or variant_name(file.name, variant, extension)
+            url = default_storage.url(name)
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            entries.append(f'{url} {width}w')
+        srcset[extension] = ', '.join(entries)
+    return srcset
@@ -0,0 +1,41 @@
+import atexit
+import logging
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener
+
+
+class QueueLogHandler(QueueHandler):
+    """
+    Handler que encola los registros y los escribe desde un hilo aparte.
+    El request solo paga el costo de formatear y encolar; la escritura al
+    stream (stdout/stderr bajo gunicorn) la hace un QueueListener.
+    """
+    def __init__(self, stream=None):
+        super().__init__(queue.SimpleQueue())
+        self.target = logging.StreamHandler(stream)
+        self.listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.close)
+
+    def close(self):
+        # Vaciar la cola antes de cerrar para no perder registros al apagar el proceso
+        if self.listener._thread is not None:
+            self.listener.stop()
+        self.target.close()
+        super().close()
+
+
+class SampledDebugFilter(logging.Filter):
+    """
+    Deja pasar solo una fracción (rate) de los registros DEBUG, que suelen
+    llevar payloads completos. Los niveles INFO y superiores pasan siempre.
+    """
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = float(rate)
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG:
+            return True
+        return random.random() < self.rate
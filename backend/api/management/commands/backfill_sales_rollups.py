@@ -0,0 +1,27 @@
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los rollups de ventas por hora del dashboard desde los pedidos existentes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Fecha inicial (YYYY-MM-DD, hora local). Por defecto todo el historial.')
+        parser.add_argument('--until', help='Fecha final exclusiva (YYYY-MM-DD, hora local).')
+
+    def parse_date(self, value):
+        try:
+            day = datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Fecha inválida: {value} (usar YYYY-MM-DD)')
+        return timezone.make_aware(datetime.combine(day, time.min))
+
+    def handle(self, *args, **options):
+        start = self.parse_date(options['since']) if options['since'] else None
+        end = self.parse_date(options['until']) if options['until'] else None
+        hours = rebuild_rollups(start, end)
+        self.stdout.write(self.style.SUCCESS(f'Rollups recalculados: {hours} horas con pedidos'))
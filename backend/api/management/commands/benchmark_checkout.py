@@ -0,0 +1,91 @@
+import json
+import multiprocessing
+import statistics
+import threading
+import time as clock
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+
+from api.models import Order
+from products.models import Product
+
+
+def _checkout(barrier, payload, report):
+    client = Client(HTTP_HOST='localhost')
+    barrier.wait()
+    started = clock.perf_counter()
+    try:
+        response = client.post('/api/orders/', payload, content_type='application/json')
+        outcome = response.status_code
+        order_id = response.json().get('id') if outcome == 201 else None
+    except Exception as e:
+        outcome, order_id = type(e).__name__, None
+    report((outcome, clock.perf_counter() - started, order_id))
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        'Lanza N checkouts simultáneos contra POST /api/orders/ (en proceso, un hilo o proceso por pedido) '
+        'y reporta errores y latencias. Los pedidos creados se borran al terminar salvo con --keep. '
+        'Usar sobre una copia de la base (DB_NAME=...).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--items', type=int, default=3, help='Productos distintos por pedido.')
+        parser.add_argument('--processes', action='store_true', help='Un proceso por pedido en vez de un hilo.')
+        parser.add_argument('--keep', action='store_true', help='No borrar los pedidos creados.')
+
+    def handle(self, *args, **options):
+        products = list(Product.objects.filter(is_active=True).values_list('id', flat=True)[:options['items']])
+        if not products:
+            raise CommandError('No hay productos activos para armar pedidos')
+        payload = json.dumps({
+            'customer_name': 'Benchmark',
+            'customer_email': 'benchmark@example.com',
+            'customer_phone': '+56900000000',
+            'delivery_street': 'Calle',
+            'delivery_number': '1',
+            'delivery_city': 'Santiago',
+            'delivery_region': 'RM',
+            'items': [{'product_id': str(product_id), 'quantity': '1'} for product_id in products],
+        })
+
+        concurrency = options['concurrency']
+        # Hilos: comparten el GIL y una caché de páginas; procesos: como varios workers de gunicorn
+        if options['processes']:
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            barrier, queue = context.Barrier(concurrency), context.Queue()
+            workers = [context.Process(target=_checkout, args=(barrier, payload, queue.put)) for _ in range(concurrency)]
+        else:
+            barrier, results = threading.Barrier(concurrency), []
+            workers = [threading.Thread(target=_checkout, args=(barrier, payload, results.append)) for _ in range(concurrency)]
+        started = clock.perf_counter()
+        for worker in workers:
+            worker.start()
+        if options['processes']:
+            results = [queue.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        wall = clock.perf_counter() - started
+
+        outcomes = Counter(outcome for outcome, _, _ in results)
+        latencies = sorted(elapsed * 1000 for _, elapsed, _ in results)
+        created = [order_id for outcome, _, order_id in results if outcome == 201]
+        self.stdout.write(f"Motor: {connection.settings_dict['ENGINE']} ({'procesos' if options['processes'] else 'hilos'})")
+        self.stdout.write(f'Checkouts: {concurrency} en {wall:.2f}s ({len(created) / wall:.1f} pedidos/s)')
+        self.stdout.write('Resultados: ' + ', '.join(f'{outcome}={count}' for outcome, count in sorted(outcomes.items(), key=str)))
+        self.stdout.write(
+            f'Latencia ms: p50={statistics.median(latencies):.0f} '
+            f'p95={latencies[int(len(latencies) * 0.95) - 1]:.0f} max={latencies[-1]:.0f}'
+        )
+
+        if created and not options['keep']:
+            Order.objects.filter(id__in=created).delete()
+        if len(created) < concurrency:
+            raise CommandError(f'{concurrency - len(created)} checkouts fallaron')
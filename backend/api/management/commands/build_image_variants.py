@@ -0,0 +1,22 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from api.images import IMAGE_FIELDS, build_variants, needs_variants
+
+
+class Command(BaseCommand):
+    help = 'Genera las variantes WebP/JPEG de las imágenes que aún no las tienen (o de todas con --all).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Regenerar también las que ya tienen variantes.')
+
+    def handle(self, *args, **options):
+        built = 0
+        for (model_label, field_name) in IMAGE_FIELDS:
+            model = apps.get_model(model_label)
+            queryset = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            for instance in queryset.iterator():
+                if options['all'] or needs_variants(instance, field_name):
+                    build_variants(model_label, instance.pk, field_name)
+                    built += 1
+        self.stdout.write(self.style.SUCCESS(f'Variantes generadas para {built} imágenes'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.query_plans import explain, full_scans, hot_queries
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta EXPLAIN QUERY PLAN sobre las consultas frecuentes y falla si alguna recorre una tabla completa.'
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('check_query_plans solo soporta SQLite (EXPLAIN QUERY PLAN)')
+
+        failures = []
+        for name, queryset in hot_queries().items():
+            plan = explain(queryset)
+            scans = full_scans(plan)
+            status = self.style.ERROR('SCAN') if scans else self.style.SUCCESS('OK')
+            self.stdout.write(f'{status} {name}')
+            for step in plan:
+                self.stdout.write(f'    {step}')
+            if scans:
+                failures.append(name)
+
+        if failures:
+            raise CommandError(f'Consultas sin índice: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('Todas las consultas frecuentes usan índices'))
@@ -0,0 +1,26 @@
+import time as clock
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.replica import refresh_replica
+
+
+class Command(BaseCommand):
+    help = 'Copia la base primaria sobre la réplica de lectura (API de backup de SQLite).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=int, help='Repetir cada N segundos (menor que DB_REPLICA_MAX_STALENESS).'
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DB_REPLICA_NAME:
+            raise CommandError('No hay réplica configurada (DB_REPLICA_NAME)')
+        while True:
+            started = clock.perf_counter()
+            refresh_replica()
+            self.stdout.write(f'Réplica actualizada en {clock.perf_counter() - started:.2f}s')
+            if not options['interval']:
+                return
+            clock.sleep(options['interval'])
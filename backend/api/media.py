@@ -0,0 +1,155 @@
+"""
+Archivos de MEDIA_ROOT servidos con cabeceras de caché y soporte de Range.
+
+Los nombres con hash de contenido (api/storage.py) se sirven con caché inmutable de un año;
+el resto con `no-cache` para que el navegador revalide con ETag/Last-Modified. Con
+settings.MEDIA_SENDFILE la transferencia la hace el servidor de adelante:
+
+- 'x-accel-redirect' (nginx): la respuesta apunta a MEDIA_ACCEL_REDIRECT_PREFIX + ruta, que
+  debe ser una location `internal` con `alias` a MEDIA_ROOT.
+- 'x-sendfile' (Apache mod_xsendfile, lighttpd): la respuesta lleva la ruta absoluta.
+
+En ambos casos Range lo resuelve ese servidor. Sin sendfile el archivo se transmite desde
+Django con FileResponse (o por partes si se pidió un rango).
+"""
+import mimetypes
+import posixpath
+import re
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from .storage import is_hashed_name
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'public, no-cache'
+RANGE_CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_range(header, size):
+    """(inicio, fin) inclusivo de un único rango de bytes; None si no aplica, ValueError si es insatisfacible."""
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or match.groups() == ('', ''):
+        # Varios rangos o sintaxis desconocida: se responde el archivo completo
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        if last and int(last) < start:
+            return None
+        end = min(int(last), size - 1) if last else size - 1
+        if start >= size:
+            raise ValueError(header)
+    else:
+        # 'bytes=-500': los últimos 500 bytes
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise ValueError(header)
+        start, end = max(size - suffix, 0), size - 1
+    return start, end
+
+
+def _file_range(path, start, end):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(RANGE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _not_modified(request, etag, mtime):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        etags = parse_etags(if_none_match)
+        # Comparación débil: W/"x" y "x" son el mismo recurso
+        return '*' in etags or etag in [e.removeprefix('W/') for e in etags]
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return if_modified_since is not None and int(mtime) <= if_modified_since
+
+
+def _range_applies(request, etag, last_modified):
+    # If-Range: el rango solo vale si el cliente tiene la misma versión del archivo
+    if_range = request.headers.get('If-Range')
+    return if_range is None or if_range in (etag, last_modified)
+
+
+@require_safe
+def serve_media(request, path):
+    path = posixpath.normpath(path).lstrip('/')
+    try:
+        fullpath = Path(safe_join(settings.MEDIA_ROOT, path))
+    except SuspiciousFileOperation:
+        raise Http404('Archivo no encontrado')
+    if not fullpath.is_file():
+        raise Http404('Archivo no encontrado')
+
+    stat = fullpath.stat()
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    last_modified = http_date(stat.st_mtime)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': last_modified,
+        'Cache-Control': IMMUTABLE_CACHE_CONTROL if is_hashed_name(path) else REVALIDATE_CACHE_CONTROL,
+    }
+    if _not_modified(request, etag, stat.st_mtime):
+        response = HttpResponseNotModified()
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    content_type, encoding = mimetypes.guess_type(str(fullpath))
+    content_type = content_type or 'application/octet-stream'
+    if encoding:
+        headers['Content-Encoding'] = encoding
+
+    sendfile = settings.MEDIA_SENDFILE
+    if sendfile == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip('/') + '/' + quote(path)
+    elif sendfile == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = str(fullpath)
+    else:
+        response = _django_response(request, fullpath, stat.st_size, content_type, etag, last_modified)
+    for header, value in headers.items():
+        response[header] = value
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def _django_response(request, fullpath, size, content_type, etag, last_modified):
+    byte_range = None
+    if _range_applies(request, etag, last_modified):
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range is None:
+        if request.method == 'HEAD':
+            response = HttpResponse(content_type=content_type)
+            response['Content-Length'] = str(size)
+            return response
+        return FileResponse(fullpath.open('rb'), content_type=content_type)
+
+    start, end = byte_range
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type, status=206)
+    else:
+        response = StreamingHttpResponse(_file_range(fullpath, start, end), content_type=content_type, status=206)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = str(end - start + 1)
+    return response
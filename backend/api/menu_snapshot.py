@@ -0,0 +1,98 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_GET
+
+from products.models import Category, Product
+from .renderers import dumps
+from .catalog import annotate_products_count, with_product_relations
+from .models import HeroSection, AboutSection, ContactInfo, FeaturedProduct, SiteConfig
+from .serializers import (
+    CategorySerializer, ProductSerializer, HeroSectionSerializer, AboutSectionSerializer,
+    ContactInfoSerializer, FeaturedProductSerializer, SiteConfigSerializer
+)
+
+SNAPSHOT_VERSION_KEY = 'menu-snapshot:version'
+# Los documentos de versiones anteriores expiran solos
+SNAPSHOT_TIMEOUT = 60 * 60 * 24
+
+
+def snapshot_version():
+    """
+    Versión actual del menú; cambia cada vez que se modifica el catálogo o el contenido del sitio.
+    Las señales solo renuevan la versión en el cache del worker que escribió (con locmem cada
+    proceso tiene el suyo), por eso la versión expira tras API_CACHE_TIMEOUT y los demás workers
+    vuelven a armar el snapshot a más tardar entonces.
+    """
+    version = cache.get(SNAPSHOT_VERSION_KEY)
+    if version is None:
+        version = bump_snapshot_version()
+    return version
+
+
+def bump_snapshot_version():
+    # Basada en tiempo para no reutilizar una versión anterior si el cache pierde la llave
+    version = time.time_ns()
+    cache.set(SNAPSHOT_VERSION_KEY, version, settings.API_CACHE_TIMEOUT)
+    return version
+
+
+def build_menu_snapshot(request):
+    """Serializar catálogo y contenido del sitio en un único documento JSON."""
+    context = {'request': request}
+
+    def first_active(model, serializer_class):
+        obj = model.objects.filter(is_active=True).first()
+        return serializer_class(obj, context=context).data if obj else None
+
+    # Sin get_or_create: escribir aquí cambiaría la versión del snapshot que se está armando
+    site_config = SiteConfig.objects.filter(id=1).first() or SiteConfig(id=1)
+    data = {
+        'categories': CategorySerializer(
+            annotate_products_count(Category.objects.all()), many=True, context=context
+        ).data,
+        'products': ProductSerializer(
+            with_product_relations(Product.objects.filter(is_active=True).order_by('id')), many=True, context=context
+        ).data,
+        'hero': first_active(HeroSection, HeroSectionSerializer),
+        'about': first_active(AboutSection, AboutSectionSerializer),
+        'contact': first_active(ContactInfo, ContactInfoSerializer),
+        'featured': first_active(FeaturedProduct, FeaturedProductSerializer),
+        'site_config': SiteConfigSerializer(site_config, context=context).data,
+    }
+    return dumps(data)
+
+
+def get_menu_snapshot(request):
+    """
+    Devolver (etag, body) del snapshot vigente. Las URLs de imágenes son absolutas,
+    por eso el documento se guarda por versión y host. El ETag depende solo del contenido:
+    si una versión nueva arma el mismo documento, los clientes siguen recibiendo 304.
+    """
+    version = snapshot_version()
+    key = f'menu-snapshot:{version}:{request.get_host()}'
+    snapshot = cache.get(key)
+    if snapshot is None:
+        body = build_menu_snapshot(request)
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        snapshot = (etag, body)
+        cache.set(key, snapshot, SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+@require_GET
+def menu_snapshot(request):
+    """Menú completo y contenido del sitio en una sola respuesta, con ETag para revalidar."""
+    etag, body = get_menu_snapshot(request)
+    if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+    if etag in if_none_match or '*' in if_none_match:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,50 @@
+from django.db import migrations
+
+SEARCH_TABLE = 'api_product_search'
+
+
+def fts5_available(schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return False
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return any(row[0] == 'ENABLE_FTS5' for row in cursor.fetchall())
+
+
+def create_search_index(apps, schema_editor):
+    # Sin FTS5 la búsqueda usa el índice en memoria de api.search
+    if not fts5_available(schema_editor):
+        return
+    Product = apps.get_model('products', 'Product')
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+        "name, category, tags, description, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    rows = [
+        (product.id, product.name, product.category.name,
+         ' '.join(tag.name for tag in product.tags.all()), product.description)
+        for product in Product.objects.select_related('category').prefetch_related('tags')
+    ]
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, name, category, tags, description) VALUES (%s, %s, %s, %s, %s)',
+            rows,
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_review_is_visible'),
+        ('products', '0002_ingredient_alter_product_image_productingredient'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
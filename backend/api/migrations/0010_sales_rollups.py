@@ -0,0 +1,54 @@
+# Generated by Django 5.0.2 on 2026-10-17 14:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_product_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HourlySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(unique=True)),
+                ('orders_count', models.IntegerField(default=0)),
+                ('cancelled_count', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('customers_sketch', models.BinaryField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Rollup de ventas por hora',
+                'verbose_name_plural': 'Rollups de ventas por hora',
+            },
+        ),
+        migrations.CreateModel(
+            name='OrderStatusCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(max_length=20, unique=True)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Conteo de pedidos por estado',
+                'verbose_name_plural': 'Conteos de pedidos por estado',
+            },
+        ),
+        migrations.CreateModel(
+            name='HourlyProductRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('product_name', models.CharField(max_length=200)),
+                ('units', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Rollup de productos por hora',
+                'verbose_name_plural': 'Rollups de productos por hora',
+                'unique_together': {('hour', 'product_name')},
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.0.2 on 2026-10-17 14:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_sales_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        # Después de la última migración de auth: en SQLite rehacer auth_user borraría el índice
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_at'], name='order_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', '-created_at'], name='order_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', '-created_at'], name='order_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['customer_email'], name='order_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['customer_phone'], name='order_phone_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(condition=models.Q(('is_approved', True), ('is_visible', True)), fields=['-created_at'], name='review_public_idx'),
+        ),
+        # Registros de usuarios por fecha (admin_stats / UserViewSet.stats); auth_user es de contrib
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS api_user_date_joined_idx ON auth_user (date_joined)',
+            'DROP INDEX IF EXISTS api_user_date_joined_idx',
+        ),
+    ]
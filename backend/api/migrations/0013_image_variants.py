@@ -0,0 +1,33 @@
+# Generated by Django 5.0.2 on 2026-10-17 14:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_order_user_updated_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aboutsection',
+            name='image_1_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='aboutsection',
+            name='image_2_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='featuredproduct',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='herosection',
+            name='background_image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,67 @@
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.db import migrations
+
+from api.rollups import customer_key, hour_bucket, sketch_add
+
+
+def backfill_sales_rollups(apps, schema_editor):
+    """
+    Llenar los rollups con el historial existente (lo mismo que `manage.py backfill_sales_rollups`
+    sin rango). Sin esto el dashboard queda vacío y los cambios de estado de pedidos anteriores
+    restan de un conteo por estado en cero.
+    """
+    Order = apps.get_model('api', 'Order')
+    OrderItem = apps.get_model('api', 'OrderItem')
+    HourlySalesRollup = apps.get_model('api', 'HourlySalesRollup')
+    HourlyProductRollup = apps.get_model('api', 'HourlyProductRollup')
+    OrderStatusCount = apps.get_model('api', 'OrderStatusCount')
+
+    sales = defaultdict(lambda: {'orders_count': 0, 'cancelled_count': 0, 'revenue': Decimal('0'), 'sketch': None})
+    statuses = Counter()
+    for created_at, status, total, email, phone in Order.objects.values_list(
+        'created_at', 'status', 'total_amount', 'customer_email', 'customer_phone'
+    ).iterator(chunk_size=2000):
+        row = sales[hour_bucket(created_at)]
+        row['orders_count'] += 1
+        row['cancelled_count'] += status == 'cancelled'
+        row['revenue'] += Decimal('0') if status == 'cancelled' else Decimal(total or 0)
+        row['sketch'] = sketch_add(row['sketch'], customer_key(email, phone))
+        statuses[status] += 1
+
+    units = Counter()
+    for created_at, name, quantity in OrderItem.objects.values_list(
+        'order__created_at', 'product_name', 'quantity'
+    ).iterator(chunk_size=2000):
+        units[(hour_bucket(created_at), name)] += quantity
+
+    HourlySalesRollup.objects.all().delete()
+    HourlyProductRollup.objects.all().delete()
+    OrderStatusCount.objects.all().delete()
+    HourlySalesRollup.objects.bulk_create([
+        HourlySalesRollup(
+            hour=hour, orders_count=row['orders_count'], cancelled_count=row['cancelled_count'],
+            revenue=row['revenue'], customers_sketch=row['sketch'],
+        )
+        for hour, row in sales.items()
+    ], batch_size=500)
+    HourlyProductRollup.objects.bulk_create([
+        HourlyProductRollup(hour=hour, product_name=name, units=quantity)
+        for (hour, name), quantity in units.items()
+    ], batch_size=500)
+    OrderStatusCount.objects.bulk_create([
+        OrderStatusCount(status=status, count=count) for status, count in statuses.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_image_variants'),
+    ]
+
+    operations = [
+        # Al revertir las filas quedan; 0010 borra las tablas
+        migrations.RunPython(backfill_sales_rollups, migrations.RunPython.noop),
+    ]
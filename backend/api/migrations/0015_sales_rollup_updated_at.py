@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-17 15:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_backfill_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hourlysalesrollup',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -11,6 +11,8 @@ class HeroSection(models.Model):
     button_text = models.CharField(max_length=100, default="Ordenar Ahora")
     button_url = models.CharField(max_length=200, default="#menu")
     background_image = models.ImageField(upload_to='hero/', blank=True, null=True)
+    # Variantes reducidas generadas por api/images.py: {'source': archivo, 'widths': {variante: ancho}, 'files': {variante: {formato: archivo}}}
+    background_image_variants = models.JSONField(default=dict, blank=True, editable=False)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -28,6 +30,9 @@ class AboutSection(models.Model):
     description = models.TextField()
     image_1 = models.ImageField(upload_to='about/', blank=True, null=True)
     image_2 = models.ImageField(upload_to='about/', blank=True, null=True)
+    # Variantes reducidas generadas por api/images.py: {'source': archivo, 'widths': {variante: ancho}, 'files': {variante: {formato: archivo}}}
+    image_1_variants = models.JSONField(default=dict, blank=True, editable=False)
+    image_2_variants = models.JSONField(default=dict, blank=True, editable=False)
     years_experience = models.IntegerField(default=5)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -65,6 +70,8 @@ class FeaturedProduct(models.Model):
     original_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
     discount_percentage = models.IntegerField(default=0)
     image = models.ImageField(upload_to='featured/', blank=True, null=True)
+    # Variantes reducidas generadas por api/images.py: {'source': archivo, 'widths': {variante: ancho}, 'files': {variante: {formato: archivo}}}
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     preparation_time = models.CharField(max_length=50, default="15-20 min")
     servings = models.CharField(max_length=50, default="4 personas")
     rating = models.DecimalField(max_digits=3, decimal_places=1, default=4.9)
@@ -134,12 +141,33 @@ class Order(models.Model):
         verbose_name = "Pedido"
         verbose_name_plural = "Pedidos"
         ordering = ['-created_at']
+        indexes = [
+            # Rangos de fechas (dashboard, exportaciones) y listado admin por fecha
+            models.Index(fields=['created_at'], name='order_created_idx'),
+            # Listado admin filtrado por estado
+            models.Index(fields=['status', '-created_at'], name='order_status_created_idx'),
+            # "Mis pedidos"
+            models.Index(fields=['user', '-created_at'], name='order_user_created_idx'),
+            # Última modificación de los pedidos de un usuario (polling condicional de "mis pedidos")
+            models.Index(fields=['user', 'updated_at'], name='order_user_updated_idx'),
+            # Búsqueda de pedidos de un cliente (invitados)
+            models.Index(fields=['customer_email'], name='order_email_idx'),
+            models.Index(fields=['customer_phone'], name='order_phone_idx'),
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Valores cargados, para que las señales sepan qué cambió (rollups de ventas)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
     
     def save(self, *args, **kwargs):
         if not self.order_number:
             # Generar número de pedido único
             self.order_number = f"ORD-{uuid.uuid4().hex[:8].upper()}"
         super().save(*args, **kwargs)
+        self._loaded_values = {f.attname: getattr(self, f.attname) for f in self._meta.concrete_fields}
     
     def __str__(self):
         return f"Pedido {self.order_number} - {self.customer_name}"
@@ -155,6 +183,16 @@ class OrderItem(models.Model):
     product_name = models.CharField(max_length=200)
     product_description = models.TextField(blank=True)
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_values = {f.attname: getattr(self, f.attname) for f in self._meta.concrete_fields}
+    
     class Meta:
         verbose_name = "Item de Pedido"
         verbose_name_plural = "Items de Pedido"
@@ -211,6 +249,13 @@ class Review(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Listado público: aprobadas y visibles, más recientes primero. Índice parcial porque
+            # Django compila is_approved=True como "WHERE is_approved", que no usa índices compuestos
+            models.Index(
+                fields=['-created_at'], condition=models.Q(is_approved=True, is_visible=True), name='review_public_idx'
+            ),
+        ]
         verbose_name = 'Reseña'
         verbose_name_plural = 'Reseñas'
 
@@ -228,3 +273,44 @@ class SiteConfig(models.Model):
 
     def __str__(self):
         return 'Configuración del sitio'
+
+# Rollups de ventas por hora para el dashboard (mantenidos por api.rollups)
+class HourlySalesRollup(models.Model):
+    hour = models.DateTimeField(unique=True)  # Inicio de la hora, en UTC
+    orders_count = models.IntegerField(default=0)
+    cancelled_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)  # Excluye cancelados
+    customers_sketch = models.BinaryField(null=True, blank=True)  # HyperLogLog de clientes distintos
+    # Última escritura de la fila: entra en la firma con la que api/timeseries.py valida los buckets cacheados
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Rollup de ventas por hora'
+        verbose_name_plural = 'Rollups de ventas por hora'
+
+    def __str__(self):
+        return f"Ventas {self.hour:%Y-%m-%d %H:00}"
+
+class HourlyProductRollup(models.Model):
+    hour = models.DateTimeField()
+    product_name = models.CharField(max_length=200)
+    units = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Rollup de productos por hora'
+        verbose_name_plural = 'Rollups de productos por hora'
+        unique_together = ['hour', 'product_name']
+
+    def __str__(self):
+        return f"{self.product_name} x{self.units} ({self.hour:%Y-%m-%d %H:00})"
+
+class OrderStatusCount(models.Model):
+    status = models.CharField(max_length=20, unique=True)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Conteo de pedidos por estado'
+        verbose_name_plural = 'Conteos de pedidos por estado'
+
+    def __str__(self):
+        return f"{self.status}: {self.count}"
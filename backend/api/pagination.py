@@ -0,0 +1,137 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginación por llave (keyset) sobre `ordering`: cada página se pide con un cursor
+    opaco que guarda los valores de la última fila vista, y la consulta filtra por
+    "posición > cursor" en vez de usar OFFSET. Las páginas son estables aunque entren
+    filas nuevas mientras el cliente pagina.
+
+    Mientras settings.API_PAGINATION_LEGACY esté activo, solo se pagina si el cliente
+    envía `cursor` o `page_size`; sin ellos la respuesta es la lista completa de antes.
+    """
+    ordering = ('-created_at', '-id')
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = None
+    max_page_size = None
+
+    def is_enabled(self, request):
+        if not getattr(settings, 'API_PAGINATION_LEGACY', False):
+            return True
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def get_page_size(self, request):
+        page_size = self.page_size or settings.API_PAGE_SIZE
+        max_page_size = self.max_page_size or settings.API_MAX_PAGE_SIZE
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return page_size
+        return max(1, min(requested, max_page_size))
+
+    def encode_cursor(self, position, reverse=False):
+        values = [value.isoformat() if isinstance(value, (date, datetime)) else value for value in position]
+        payload = json.dumps({'p': values, 'r': reverse}, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)))
+            values = payload['p']
+            if len(values) != len(self.ordering):
+                raise ValueError
+            fields = [model._meta.get_field(name.lstrip('-')) for name in self.ordering]
+            position = [field.to_python(value) for field, value in zip(fields, values)]
+            return position, bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, binascii.Error, ValidationError):
+            raise NotFound('Cursor inválido')
+
+    def position_filter(self, ordering, position):
+        """(a, b) "después de" (x, y) en orden lexicográfico: a > x OR (a = x AND b > y)."""
+        condition = Q(pk__in=[])
+        equal = Q()
+        for name, value in zip(ordering, position):
+            field = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{field}__{lookup}': value})
+            equal &= Q(**{field: value})
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_enabled(request):
+            return None
+        self.request = request
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request, queryset.model)
+
+        # Para la página anterior se recorre en orden inverso y luego se invierte el resultado
+        ordering = [name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering] if reverse else list(self.ordering)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.position_filter(ordering, position))
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.page = rows
+        return rows
+
+    def get_position(self, row):
+        return [getattr(row, name.lstrip('-')) for name in self.ordering]
+
+    def get_link(self, row, reverse):
+        url = self.request.build_absolute_uri()
+        if row is None:
+            return remove_query_param(url, self.cursor_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.get_position(row), reverse))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.get_link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return self.get_link(None, reverse=True)
+        return self.get_link(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class CreatedAtKeysetPagination(KeysetPagination):
+    """Pedidos y reseñas: más recientes primero, desempate por id."""
+    ordering = ('-created_at', '-id')
+
+
+class IdKeysetPagination(KeysetPagination):
+    """Productos: por id ascendente (orden del menú)."""
+    ordering = ('id',)
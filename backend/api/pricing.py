@@ -0,0 +1,148 @@
+"""
+Catálogo de precios compilado en memoria (cotizaciones y checkout).
+
+Cada proceso guarda una instancia inmutable de PricingCatalog con los productos, su precio
+base y, por producto, los ingredientes activos con su costo extra. Se arma con dos consultas
+y se reemplaza entera con una sola asignación (los lectores no toman locks) cuando cambia la
+versión del catálogo, una firma que se lee de la base: así los cambios hechos por otros
+workers se ven aunque cada proceso tenga su propio cache. Los montos son los Decimal de la
+base, sin pasar por float.
+"""
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from products.models import Ingredient, Product, ProductIngredient
+
+
+class CompiledIngredient:
+    __slots__ = ('ingredient_id', 'name', 'default_included', 'extra_cost')
+
+    def __init__(self, ingredient_id, name, default_included, extra_cost):
+        self.ingredient_id = ingredient_id
+        self.name = name
+        self.default_included = default_included
+        self.extra_cost = extra_cost
+
+
+class CompiledProduct:
+    __slots__ = ('id', 'name', 'description', 'price', 'is_active', 'ingredients')
+
+    def __init__(self, id, name, description, price, is_active, ingredients):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.price = price
+        self.is_active = is_active
+        # {ingredient_id: CompiledIngredient} de los ingredientes activos, en orden de creación
+        self.ingredients = ingredients
+
+    def quote(self, extra_ids):
+        """(precio base, total de extras, total) con extras opcionales (no incluidos por defecto)."""
+        extras_total = Decimal('0')
+        for ingredient_id in set(extra_ids):
+            ingredient = self.ingredients.get(ingredient_id)
+            if ingredient is not None and not ingredient.default_included:
+                extras_total += ingredient.extra_cost
+        return self.price, extras_total, self.price + extras_total
+
+
+class PricingCatalog:
+    __slots__ = ('version', 'built_at', 'products')
+
+    def __init__(self, version, built_at, products):
+        self.version = version
+        self.built_at = built_at
+        # {product_id: CompiledProduct}, activos e inactivos (el checkout no filtra por is_active)
+        self.products = products
+
+    def get(self, product_id, active_only=False):
+        product = self.products.get(product_id)
+        if product is None or (active_only and not product.is_active):
+            return None
+        return product
+
+
+def catalog_version():
+    """
+    Firma del catálogo en la base: cantidad de filas y última modificación (updated_at) de
+    productos, ingredientes y sus relaciones, en una consulta. Cambia con cualquier alta, baja o
+    edición hecha con save()/delete(), en este proceso o en otro.
+    """
+    quote = connection.ops.quote_name
+    columns = []
+    for model in (Product, Ingredient, ProductIngredient):
+        table = quote(model._meta.db_table)
+        columns += [f'(SELECT COUNT(*) FROM {table})', f'(SELECT MAX({quote("updated_at")}) FROM {table})']
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT ' + ', '.join(columns))
+        return tuple(cursor.fetchone())
+
+
+def _expire_check():
+    global _checked_at
+    _checked_at = None
+
+
+def catalog_changed():
+    """
+    Verificar la versión en la próxima lectura, sin esperar PRICING_CATALOG_CHECK_INTERVAL: ahora
+    (lecturas dentro de la misma transacción) y al confirmar (los demás hilos del proceso).
+    """
+    _expire_check()
+    transaction.on_commit(_expire_check)
+
+
+def build_catalog(version, built_at):
+    ingredients = {}
+    for product_id, ingredient_id, name, default_included, extra_cost in (
+        ProductIngredient.objects.filter(is_active=True)
+        .order_by('id')
+        .values_list('product_id', 'ingredient_id', 'ingredient__name', 'default_included', 'extra_cost')
+    ):
+        ingredients.setdefault(product_id, {})[ingredient_id] = CompiledIngredient(
+            ingredient_id, name, default_included, extra_cost
+        )
+    products = {
+        product_id: CompiledProduct(product_id, name, description, price, is_active, ingredients.get(product_id, {}))
+        for product_id, name, description, price, is_active in Product.objects.values_list(
+            'id', 'name', 'description', 'price', 'is_active'
+        )
+    }
+    return PricingCatalog(version, built_at, products)
+
+
+_catalog = None
+# time.monotonic() de la última verificación de la versión (None: verificar en la próxima lectura)
+_checked_at = None
+_build_lock = threading.Lock()
+
+
+def _recently_checked(now):
+    return _checked_at is not None and now - _checked_at < settings.PRICING_CATALOG_CHECK_INTERVAL
+
+
+def get_catalog():
+    """
+    Catálogo vigente del proceso. La versión se consulta a la base a lo sumo cada
+    PRICING_CATALOG_CHECK_INTERVAL segundos y el catálogo se recompila si cambió o si tiene más
+    de PRICING_CATALOG_MAX_AGE segundos (p.ej. tras un update() masivo que no toca updated_at).
+    """
+    global _catalog, _checked_at
+    catalog = _catalog
+    if catalog is not None and _recently_checked(time.monotonic()):
+        return catalog
+    with _build_lock:
+        now = time.monotonic()
+        catalog = _catalog
+        # Otro hilo pudo haberlo verificado mientras se esperaba el lock
+        if catalog is not None and _recently_checked(now):
+            return catalog
+        version = catalog_version()
+        if catalog is None or catalog.version != version or now - catalog.built_at >= settings.PRICING_CATALOG_MAX_AGE:
+            catalog = _catalog = build_catalog(version, now)
+        _checked_at = now
+    return catalog
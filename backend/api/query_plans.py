@@ -0,0 +1,48 @@
+"""
+Consultas frecuentes de api/views.py, api/admin_dashboard.py y api/rollups.py, para
+verificar con EXPLAIN QUERY PLAN (manage.py check_query_plans) que usan un índice.
+"""
+import re
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Max
+from django.utils import timezone
+
+from products.models import Product
+from .models import Order, OrderItem, Review, HourlySalesRollup, HourlyProductRollup
+
+
+def hot_queries():
+    """{nombre: queryset} con valores representativos para cada acceso frecuente."""
+    now = timezone.now()
+    month_ago = now - timedelta(days=30)
+    return {
+        'orders.list_by_status': Order.objects.filter(status='pending').order_by('-created_at'),
+        'orders.my': Order.objects.filter(user_id=1).order_by('-created_at'),
+        'orders.my_last_modified': Order.objects.filter(user_id=1).values('user').annotate(last=Max('updated_at')),
+        'orders.created_range': Order.objects.filter(created_at__gte=month_ago, created_at__lte=now),
+        'orders.by_email': Order.objects.filter(customer_email='cliente@example.com'),
+        'orders.by_phone': Order.objects.filter(customer_phone='+56900000000'),
+        'order_items.by_order': OrderItem.objects.filter(order_id=1),
+        'reviews.public': Review.objects.filter(is_approved=True, is_visible=True).order_by('-created_at'),
+        'products.by_category': Product.objects.filter(is_active=True, category_id=1),
+        'products.featured': Product.objects.filter(is_active=True).order_by('-created_at')[:6],
+        'rollups.sales_range': HourlySalesRollup.objects.filter(hour__gte=month_ago, hour__lte=now),
+        'rollups.products_range': HourlyProductRollup.objects.filter(hour__gte=month_ago, hour__lte=now),
+        'users.joined_range': get_user_model().objects.filter(date_joined__gte=month_ago, date_joined__lte=now),
+    }
+
+
+def explain(queryset):
+    """Filas de EXPLAIN QUERY PLAN (solo SQLite) para el SQL del queryset."""
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def full_scans(plan):
+    """Pasos del plan que recorren una tabla completa sin índice ('SCAN tabla' sin 'USING')."""
+    return [step for step in plan if re.match(r'SCAN \S+$', step.strip())]
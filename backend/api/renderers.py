@@ -0,0 +1,70 @@
+"""
+Renderer y parser JSON con backend intercambiable (settings.API_JSON_BACKEND).
+
+'auto' usa orjson si está instalado y si no el json estándar de DRF; 'orjson' y
+'stdlib' fuerzan uno u otro. La salida es la misma que la de JSONRenderer de DRF:
+Decimal como número, datetimes en ISO 8601 con 'Z' para UTC y U+2028/U+2029
+escapados. Las respuestas con indentación (API navegable, `; indent=`) siempre
+usan el json estándar.
+"""
+import io
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Datetimes por el encoder de DRF (orjson escribe '+00:00' y microsegundos distinto)
+ORJSON_OPTIONS = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+_drf_encoder = JSONEncoder()
+
+
+def use_orjson():
+    backend = getattr(settings, 'API_JSON_BACKEND', 'auto')
+    if backend == 'orjson' and orjson is None:
+        raise RuntimeError("API_JSON_BACKEND='orjson' pero orjson no está instalado")
+    return orjson is not None and backend != 'stdlib'
+
+
+def dumps(data):
+    """JSON compacto en bytes, igual al de JSONRenderer de DRF."""
+    if not use_orjson():
+        return JSONRenderer().render(data)
+    content = orjson.dumps(data, default=_drf_encoder.default, option=ORJSON_OPTIONS)
+    if b'\xe2\x80\xa8' in content or b'\xe2\x80\xa9' in content:
+        content = content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    return content
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not use_orjson() or self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            return dumps(data)
+        except TypeError:
+            # Tipos que orjson no acepta (p.ej. enteros de más de 64 bits): ruta estándar
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        if not use_orjson() or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        content = stream.read()
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            # Mismo mensaje de error (y soporte de enteros grandes) que el parser estándar
+            return super().parse(io.BytesIO(content), media_type, parser_context)
@@ -0,0 +1,103 @@
+"""
+Réplica de solo lectura para analítica (dashboard, estadísticas y exportaciones).
+
+La réplica es una copia del archivo SQLite primario hecha con la API de backup de SQLite
+(`manage.py refresh_replica`, p.ej. desde cron o con --interval). Las vistas marcadas con
+use_analytics_db leen de ella mientras su última copia tenga menos de
+DB_REPLICA_MAX_STALENESS segundos; si no existe o está vencida se lee de la primaria.
+Todas las escrituras van a la primaria (AnalyticsRouter.db_for_write).
+"""
+import functools
+import logging
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+logger = logging.getLogger(__name__)
+
+REPLICA_ALIAS = 'replica'
+
+# Alias elegido para las lecturas del bloque analytics_reads() en curso
+_read_alias = ContextVar('analytics_read_alias', default=None)
+
+
+def replica_age(path):
+    """Segundos desde la última copia, o None si la réplica no existe."""
+    try:
+        return time.time() - os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def analytics_db():
+    """Alias para lecturas analíticas: la réplica si está configurada y al día, si no la primaria."""
+    if not settings.DB_REPLICA_NAME:
+        return DEFAULT_DB_ALIAS
+    age = replica_age(settings.DB_REPLICA_NAME)
+    if age is None or age > settings.DB_REPLICA_MAX_STALENESS:
+        logger.info('Réplica %s, leyendo de la primaria', 'inexistente' if age is None else f'con {age:.0f}s de atraso')
+        return DEFAULT_DB_ALIAS
+    return REPLICA_ALIAS
+
+
+@contextmanager
+def analytics_reads():
+    token = _read_alias.set(analytics_db())
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def use_analytics_db(view):
+    """Decorador de vistas cuyas lecturas pueden ir a la réplica."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        with analytics_reads():
+            return view(*args, **kwargs)
+    return wrapper
+
+
+class AnalyticsRouter:
+    def db_for_read(self, model, **hints):
+        # None fuera de analytics_reads(): Django usa 'default'
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Ambas bases tienen los mismos datos
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # El esquema de la réplica llega con la copia
+        return db == DEFAULT_DB_ALIAS
+
+
+def refresh_replica(source=None, target=None):
+    """
+    Copiar la primaria sobre la réplica. El backup es consistente aunque haya escrituras en
+    curso, y los lectores de la réplica ven la copia anterior o la nueva completa.
+    """
+    source = source or settings.DATABASES[DEFAULT_DB_ALIAS]['NAME']
+    target = target or settings.DB_REPLICA_NAME
+    timeout = settings.DB_BUSY_TIMEOUT / 1000
+    started = time.time()
+    src = sqlite3.connect(source, timeout=timeout)
+    dst = sqlite3.connect(target, timeout=timeout)
+    try:
+        src.backup(dst)
+        # La copia hereda el modo WAL de la primaria; en modo rollback los lectores no necesitan -shm
+        dst.execute('PRAGMA journal_mode=DELETE')
+    finally:
+        dst.close()
+        src.close()
+    # La edad de la réplica se mide por la fecha de modificación del archivo: la del inicio de la
+    # copia, ya que lo escrito en la primaria durante el backup puede no estar incluido
+    os.utime(target, (started, started))
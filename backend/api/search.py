@@ -0,0 +1,150 @@
+"""
+Búsqueda de productos por texto.
+
+Con SQLite se usa una tabla virtual FTS5 (api_product_search, creada por migración)
+con tokenizer unicode61 sin diacríticos, de modo que "limon" encuentra "Limón".
+Si FTS5 no está disponible (u otro motor de base de datos) se usa un índice
+invertido en memoria con la misma normalización, ranking y búsqueda por prefijo.
+"""
+import re
+import time
+import unicodedata
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from products.models import Product
+
+SEARCH_TABLE = 'api_product_search'
+# Versión compartida entre procesos para descartar índices en memoria desactualizados
+PYTHON_INDEX_VERSION_KEY = 'search:python-index:version'
+
+# Peso de cada campo en el ranking (mismo orden que las columnas de la tabla FTS5)
+FIELD_WEIGHTS = (('name', 10.0), ('category', 4.0), ('tags', 4.0), ('description', 1.0))
+
+_fts5_enabled = None
+_python_index = (None, None)
+
+
+def normalize(text):
+    """Minúsculas y sin tildes: 'Limón' -> 'limon'."""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text):
+    return re.findall(r'\w+', normalize(text))
+
+
+def product_document(product):
+    return {
+        'name': product.name,
+        'category': product.category.name,
+        'tags': ' '.join(tag.name for tag in product.tags.all()),
+        'description': product.description,
+    }
+
+
+def use_fts5():
+    global _fts5_enabled
+    if _fts5_enabled is None:
+        _fts5_enabled = (
+            getattr(settings, 'PRODUCT_SEARCH_BACKEND', 'auto') != 'python'
+            and connection.vendor == 'sqlite'
+            and SEARCH_TABLE in connection.introspection.table_names()
+        )
+    return _fts5_enabled
+
+
+class InvertedIndex:
+    """Índice invertido en memoria: token -> {product_id: puntaje}, con vocabulario ordenado para prefijos."""
+
+    def __init__(self, documents):
+        postings = {}
+        for product_id, fields in documents:
+            for field, weight in FIELD_WEIGHTS:
+                for token in tokenize(fields[field]):
+                    scores = postings.setdefault(token, {})
+                    scores[product_id] = scores.get(product_id, 0.0) + weight
+        self.postings = postings
+        self.vocabulary = sorted(postings)
+
+    def _prefix_matches(self, prefix):
+        matches = {}
+        i = bisect_left(self.vocabulary, prefix)
+        while i < len(self.vocabulary) and self.vocabulary[i].startswith(prefix):
+            for product_id, score in self.postings[self.vocabulary[i]].items():
+                matches[product_id] = matches.get(product_id, 0.0) + score
+            i += 1
+        return matches
+
+    def search(self, query):
+        """IDs que contienen todos los términos (como prefijo), del más al menos relevante."""
+        scores = None
+        for token in tokenize(query):
+            matches = self._prefix_matches(token)
+            if scores is None:
+                scores = matches
+            else:
+                scores = {pid: score + matches[pid] for pid, score in scores.items() if pid in matches}
+            if not scores:
+                return []
+        if not scores:
+            return []
+        return sorted(scores, key=lambda pid: (-scores[pid], pid))
+
+
+def _build_python_index():
+    products = Product.objects.select_related('category').prefetch_related('tags')
+    return InvertedIndex((product.id, product_document(product)) for product in products.iterator(chunk_size=2000))
+
+
+def search_product_ids(query):
+    """IDs de productos que coinciden con la búsqueda, ordenados por relevancia."""
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+    if use_fts5():
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        weights = ', '.join(str(weight) for _, weight in FIELD_WEIGHTS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s '
+                f'ORDER BY bm25({SEARCH_TABLE}, {weights})',
+                [match],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    global _python_index
+    version = cache.get(PYTHON_INDEX_VERSION_KEY)
+    index_version, index = _python_index
+    if index is None or index_version != version:
+        index = _build_python_index()
+        _python_index = (version, index)
+    return index.search(query)
+
+
+def reindex_products(product_ids):
+    """Sincronizar el índice con el estado actual de los productos (los borrados salen del índice)."""
+    cache.set(PYTHON_INDEX_VERSION_KEY, time.time_ns(), None)
+    product_ids = list(product_ids)
+    if not product_ids or not use_fts5():
+        return
+    products = Product.objects.filter(id__in=product_ids).select_related('category').prefetch_related('tags')
+    columns = [field for field, _ in FIELD_WEIGHTS]
+    placeholders = ', '.join(['%s'] * (len(columns) + 1))
+    rows = []
+    for product in products:
+        document = product_document(product)
+        rows.append([product.id] + [document[field] for field in columns])
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({", ".join(["%s"] * len(product_ids))})',
+            product_ids,
+        )
+        cursor.executemany(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, {", ".join(columns)}) VALUES ({placeholders})',
+            rows,
+        )
@@ -1,7 +1,17 @@
+import logging
+from decimal import Decimal
+from django.db.models import Prefetch
 from rest_framework import serializers
 from products.models import Category, Product, ProductTag, Ingredient, ProductIngredient
+from .catalog import active_product_counts
+from .images import image_srcset
+from .pricing import get_catalog
+from .rollups import record_order_items
+from .transactions import atomic_with_retry
 from .models import HeroSection, AboutSection, ContactInfo, FeaturedProduct, Order, OrderItem, OrderItemExtra, OrderItemIngredient, Review, SiteConfig
 
+logger = logging.getLogger(__name__)
+
 class ProductTagSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductTag
@@ -15,7 +25,10 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'icon', 'products_count']
     
     def get_products_count(self, obj):
-        return obj.products.filter(is_active=True).count()
+        # Las vistas de categorías anotan el conteo; en serializers anidados se usa el cache
+        if hasattr(obj, 'products_count'):
+            return obj.products_count
+        return active_product_counts().get(obj.id, 0)
 
 # NUEVOS SERIALIZERS PARA INGREDIENTES
 class IngredientSerializer(serializers.ModelSerializer):
@@ -38,12 +51,14 @@ class ProductSerializer(serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     category_icon = serializers.CharField(source='category.icon', read_only=True)
     image_url = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
     product_ingredients = ProductIngredientSerializer(many=True, required=False)
     
     class Meta:
         model = Product
         fields = ['id', 'name', 'description', 'price', 'category', 'category_name', 
-                 'category_icon', 'image', 'image_url', 'is_active', 'tags', 'product_ingredients', 'created_at', 'updated_at']
+                 'category_icon', 'image', 'image_url', 'image_srcset', 'is_active', 'tags', 'product_ingredients',
+                 'created_at', 'updated_at']
     
     def get_image_url(self, obj):
         if obj.image:
@@ -52,6 +67,9 @@ class ProductSerializer(serializers.ModelSerializer):
                 return request.build_absolute_uri(obj.image.url)
         return None
 
+    def get_image_srcset(self, obj):
+        return image_srcset(obj.image, obj.image_variants, self.context.get('request'))
+
 # SERIALIZER PARA RESEÑAS
 class ReviewSerializer(serializers.ModelSerializer):
     username = serializers.SerializerMethodField()
@@ -82,11 +100,12 @@ class ProductDetailSerializer(ProductSerializer):
 # Serializers para contenido dinámico
 class HeroSectionSerializer(serializers.ModelSerializer):
     background_image_url = serializers.SerializerMethodField()
+    background_image_srcset = serializers.SerializerMethodField()
     
     class Meta:
         model = HeroSection
         fields = ['id', 'title', 'subtitle', 'button_text', 'button_url', 
-                 'background_image', 'background_image_url', 'is_active', 'created_at', 'updated_at']
+                 'background_image', 'background_image_url', 'background_image_srcset', 'is_active', 'created_at', 'updated_at']
     
     def get_background_image_url(self, obj):
         if obj.background_image:
@@ -95,14 +114,19 @@ class HeroSectionSerializer(serializers.ModelSerializer):
                 return request.build_absolute_uri(obj.background_image.url)
         return None
 
+    def get_background_image_srcset(self, obj):
+        return image_srcset(obj.background_image, obj.background_image_variants, self.context.get('request'))
+
 class AboutSectionSerializer(serializers.ModelSerializer):
     image_1_url = serializers.SerializerMethodField()
     image_2_url = serializers.SerializerMethodField()
+    image_1_srcset = serializers.SerializerMethodField()
+    image_2_srcset = serializers.SerializerMethodField()
     
     class Meta:
         model = AboutSection
-        fields = ['id', 'title', 'subtitle', 'description', 'image_1', 'image_1_url',
-                 'image_2', 'image_2_url', 'years_experience', 'is_active', 'created_at', 'updated_at']
+        fields = ['id', 'title', 'subtitle', 'description', 'image_1', 'image_1_url', 'image_1_srcset',
+                 'image_2', 'image_2_url', 'image_2_srcset', 'years_experience', 'is_active', 'created_at', 'updated_at']
     
     def get_image_1_url(self, obj):
         if obj.image_1:
@@ -118,6 +142,12 @@ class AboutSectionSerializer(serializers.ModelSerializer):
                 return request.build_absolute_uri(obj.image_2.url)
         return None
 
+    def get_image_1_srcset(self, obj):
+        return image_srcset(obj.image_1, obj.image_1_variants, self.context.get('request'))
+
+    def get_image_2_srcset(self, obj):
+        return image_srcset(obj.image_2, obj.image_2_variants, self.context.get('request'))
+
 class ContactInfoSerializer(serializers.ModelSerializer):
     class Meta:
         model = ContactInfo
@@ -126,13 +156,14 @@ class ContactInfoSerializer(serializers.ModelSerializer):
 
 class FeaturedProductSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
     discount_amount = serializers.ReadOnlyField()
     discount_percentage_calculated = serializers.ReadOnlyField()
     
     class Meta:
         model = FeaturedProduct
         fields = ['id', 'name', 'description', 'price', 'original_price', 'discount_percentage',
-                 'image', 'image_url', 'preparation_time', 'servings', 'rating', 'reviews_count',
+                 'image', 'image_url', 'image_srcset', 'preparation_time', 'servings', 'rating', 'reviews_count',
                  'discount_amount', 'discount_percentage_calculated', 'is_active', 'created_at', 'updated_at']
     
     def get_image_url(self, obj):
@@ -142,6 +173,9 @@ class FeaturedProductSerializer(serializers.ModelSerializer):
                 return request.build_absolute_uri(obj.image.url)
         return None
 
+    def get_image_srcset(self, obj):
+        return image_srcset(obj.image, obj.image_variants, self.context.get('request'))
+
 # SERIALIZERS PARA PEDIDOS
 class OrderItemExtraSerializer(serializers.ModelSerializer):
     class Meta:
@@ -173,6 +207,25 @@ class OrderSerializer(serializers.ModelSerializer):
                  'created_at', 'updated_at', 'items']
         read_only_fields = ['order_number', 'created_at', 'updated_at']
 
+class OrderItemSummarySerializer(serializers.ModelSerializer):
+    extras = OrderItemExtraSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = OrderItem
+        fields = ['id', 'product', 'product_name', 'quantity', 'unit_price', 'total_price', 'extras']
+
+class OrderSummarySerializer(OrderSerializer):
+    """Pedido para listados: sin descripción de producto ni ingredientes por item."""
+    items = OrderItemSummarySerializer(many=True, read_only=True)
+
+def with_order_relations(queryset, summary=False):
+    """Cargar items, extras e ingredientes que anida OrderSerializer (o OrderSummarySerializer) en consultas fijas."""
+    if summary:
+        items = OrderItem.objects.defer('product_description').prefetch_related('extras')
+    else:
+        items = OrderItem.objects.prefetch_related('extras', 'ingredients')
+    return queryset.prefetch_related(Prefetch('items', queryset=items.order_by('id')))
+
 class CreateOrderSerializer(serializers.Serializer):
     # Información del cliente
     customer_name = serializers.CharField(max_length=200)
@@ -196,32 +249,31 @@ class CreateOrderSerializer(serializers.Serializer):
     
     def validate(self, data):
         """Validar los datos antes de crear la orden"""
-        print("=== DATOS RECIBIDOS EN EL SERIALIZER ===")
-        print(f"Data completa: {data}")
-        print(f"Items: {data.get('items', [])}")
+        logger.debug("Validando pedido: %s", data)
         
         # Validar que hay items
         items = data.get('items', [])
         if not items:
             raise serializers.ValidationError("Debe incluir al menos un item en el pedido")
         
-        # Validar cada item
+        # Resolver los productos del carrito en el catálogo compilado (sin consultas si está al día)
+        product_ids = []
         for i, item in enumerate(items):
-            print(f"Item {i}: {item}")
-            
-            # Verificar que el producto existe
             product_id = item.get('product_id')
             if not product_id:
                 raise serializers.ValidationError(f"Item {i}: product_id es requerido")
-            
             try:
-                from products.models import Product
-                product = Product.objects.get(id=product_id)
-                print(f"Producto encontrado: {product.name}")
-            except Product.DoesNotExist:
-                raise serializers.ValidationError(f"Item {i}: Producto con ID {product_id} no existe")
-            except ValueError:
+                product_ids.append(int(product_id))
+            except (TypeError, ValueError):
                 raise serializers.ValidationError(f"Item {i}: product_id debe ser un número válido")
+        self._catalog = get_catalog()
+        
+        # Validar cada item
+        for i, item in enumerate(items):
+            # Verificar que el producto existe
+            product = self._catalog.get(product_ids[i])
+            if product is None:
+                raise serializers.ValidationError(f"Item {i}: Producto con ID {item['product_id']} no existe")
             
             # Verificar quantity
             quantity = item.get('quantity')
@@ -238,9 +290,6 @@ class CreateOrderSerializer(serializers.Serializer):
         return data
     
     def create(self, validated_data):
-        print("=== CREANDO ORDEN ===")
-        print(f"Validated data: {validated_data}")
-        
         items_data = validated_data.pop('items')
         
         # Crear la dirección completa
@@ -251,111 +300,109 @@ class CreateOrderSerializer(serializers.Serializer):
         
         validated_data['delivery_address'] = delivery_address
         
-        # Calcular el total del pedido
-        total_amount = 0
+        # Reutilizar la versión del catálogo usada en validate() para calcular precios sobre
+        # exactamente los mismos productos que se validaron
+        catalog = getattr(self, '_catalog', None) or get_catalog()
         
-        # Crear el pedido
-        order = Order.objects.create(**validated_data, total_amount=0)
-        print(f"Orden creada con ID: {order.id}")
+        # Armar en memoria los items, extras e ingredientes del pedido
+        total_amount = Decimal('0')
+        order_items = []
+        item_extras = []
+        item_ingredients = []
         
-        # Crear los items del pedido
         for item_data in items_data:
-            print(f"Procesando item: {item_data}")
-            
-            from products.models import Product, ProductIngredient
-            product = Product.objects.get(id=item_data['product_id'])
+            product = catalog.get(int(item_data['product_id']))
             quantity = int(item_data['quantity'])
+            by_ingredient = product.ingredients
             
             # Calcular precio unitario (precio base + extras)
-            unit_price = float(product.price)
+            extras = []
+            for ingredient_id, extra_quantity in item_data.get('extras', {}).items():
+                extra_quantity = int(extra_quantity)
+                if extra_quantity <= 0:
+                    continue
+                ingredient = by_ingredient.get(int(ingredient_id))
+                if ingredient is None:
+                    logger.warning("ProductIngredient no encontrado para producto %s e ingrediente %s", product.id, ingredient_id)
+                    continue
+                extras.append((ingredient, extra_quantity))
             
-            # Procesar extras si existen
-            extras_data = item_data.get('extras', {})
-            extras_total = 0
-            
-            for ingredient_id, extra_quantity in extras_data.items():
-                if int(extra_quantity) > 0:
-                    try:
-                        product_ingredient = ProductIngredient.objects.get(
-                            product=product, 
-                            ingredient_id=ingredient_id
-                        )
-                        extras_total += float(product_ingredient.extra_cost) * int(extra_quantity)
-                    except ProductIngredient.DoesNotExist:
-                        print(f"ProductIngredient no encontrado para producto {product.id} e ingrediente {ingredient_id}")
-                        continue
-            
-            unit_price += extras_total
+            extras_total = sum((ingredient.extra_cost * extra_quantity for ingredient, extra_quantity in extras), Decimal('0'))
+            unit_price = product.price + extras_total
             total_price = unit_price * quantity
+            total_amount += total_price
             
-            # Crear el item del pedido
-            order_item = OrderItem.objects.create(
-                order=order,
-                product=product,
+            order_item = OrderItem(
+                product_id=product.id,
                 product_name=product.name,
                 product_description=product.description,
                 quantity=quantity,
                 unit_price=unit_price,
                 total_price=total_price
             )
-            print(f"OrderItem creado: {order_item.id}")
+            order_items.append(order_item)
             
-            # Crear los extras del item
-            for ingredient_id, extra_quantity in extras_data.items():
-                if int(extra_quantity) > 0:
-                    try:
-                        product_ingredient = ProductIngredient.objects.get(
-                            product=product, 
-                            ingredient_id=ingredient_id
-                        )
-                        ingredient = product_ingredient.ingredient
-                        extra_unit_price = float(product_ingredient.extra_cost)
-                        extra_total_price = extra_unit_price * int(extra_quantity)
-                        
-                        OrderItemExtra.objects.create(
-                            order_item=order_item,
-                            ingredient=ingredient,
-                            ingredient_name=ingredient.name,
-                            quantity=int(extra_quantity),
-                            unit_price=extra_unit_price,
-                            total_price=extra_total_price
-                        )
-                        print(f"OrderItemExtra creado para ingrediente {ingredient.name}")
-                    except ProductIngredient.DoesNotExist:
-                        print(f"ProductIngredient no encontrado para extra: producto {product.id}, ingrediente {ingredient_id}")
-                        continue
-            
-            # Crear los ingredientes del item (incluidos/excluidos)
-            from products.models import ProductIngredient
-            product_ingredients = ProductIngredient.objects.filter(product=product, is_active=True)
+            for ingredient, extra_quantity in extras:
+                item_extras.append(OrderItemExtra(
+                    order_item=order_item,
+                    ingredient_id=ingredient.ingredient_id,
+                    ingredient_name=ingredient.name,
+                    quantity=extra_quantity,
+                    unit_price=ingredient.extra_cost,
+                    total_price=ingredient.extra_cost * extra_quantity
+                ))
             
-            # Obtener ingredientes incluidos del frontend (si se envían)
+            # Ingredientes del item (incluidos/excluidos). Si el frontend envía la lista
+            # de incluidos se usa esa, si no, los valores por defecto del producto.
             included_ingredients = item_data.get('included_ingredients', [])
-            
-            for product_ingredient in product_ingredients:
-                ingredient = product_ingredient.ingredient
-                was_default = product_ingredient.default_included
-                
-                # Si se enviaron ingredientes incluidos específicos, usar esa lista
-                # Si no, usar los valores por defecto
+            for ingredient in by_ingredient.values():
+                was_default = ingredient.default_included
                 if included_ingredients:
-                    is_included = str(ingredient.id) in included_ingredients
+                    is_included = str(ingredient.ingredient_id) in included_ingredients
                 else:
                     is_included = was_default
-                
-                OrderItemIngredient.objects.create(
+                item_ingredients.append(OrderItemIngredient(
                     order_item=order_item,
-                    ingredient=ingredient,
+                    ingredient_id=ingredient.ingredient_id,
                     ingredient_name=ingredient.name,
                     is_included=is_included,
                     was_default=was_default
-                )
-            
-            total_amount += total_price
+                ))
         
-        # Actualizar el total del pedido
-        order.total_amount = total_amount
-        order.save()
+        # Persistir todo en una sola transacción con inserciones masivas
+        product_ids = [int(item_data['product_id']) for item_data in items_data]
+
+        def persist():
+            # El catálogo en memoria puede no ver aún un producto borrado por otro worker: confirmar
+            # dentro de la transacción (con FOR UPDATE donde existe) que siguen en la base
+            existing = set(
+                Product.objects.select_for_update().filter(id__in=product_ids).values_list('id', flat=True)
+            )
+            missing = [(i, product_id) for i, product_id in enumerate(product_ids) if product_id not in existing]
+            if missing:
+                raise serializers.ValidationError(
+                    [f"Item {i}: Producto con ID {product_id} no existe" for i, product_id in missing]
+                )
+            order = Order.objects.create(**validated_data, total_amount=total_amount)
+            for order_item in order_items:
+                # En un reintento los ids del intento deshecho ya no valen
+                order_item.pk = None
+                order_item.order = order
+            OrderItem.objects.bulk_create(order_items)
+            # bulk_create no envía post_save: sumar las unidades al rollup explícitamente
+            record_order_items(order_items, order.created_at)
+            for related in item_extras + item_ingredients:
+                # Igual que los items: sin ids del intento anterior y apuntando al item recién guardado
+                related.pk = None
+                related.order_item = related.order_item
+            if item_extras:
+                OrderItemExtra.objects.bulk_create(item_extras)
+            if item_ingredients:
+                OrderItemIngredient.objects.bulk_create(item_ingredients)
+            return order
+
+        # Con varios checkouts a la vez SQLite puede estar bloqueada: reintentar la transacción
+        order = atomic_with_retry(persist)
         
-        print(f"Orden completada con total: {total_amount}")
-        return order
\ No newline at end of file
+        logger.info("Pedido %s creado con total %s", order.order_number, total_amount)
+        return order
@@ -0,0 +1,130 @@
+from django.db.models.signals import post_save, post_delete
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from products.models import Category, Product, ProductTag, Ingredient, ProductIngredient
+from .auth_backends import token_cache
+from .catalog import invalidate_product_counts
+from .events import publish_order_event
+from .images import IMAGE_FIELDS, needs_variants, schedule_variants
+from .menu_snapshot import bump_snapshot_version
+from .pricing import catalog_changed
+from .search import reindex_products
+from .models import HeroSection, AboutSection, ContactInfo, FeaturedProduct, SiteConfig, Order, OrderItem
+from .rollups import (
+    record_order_created, record_order_changed, record_order_deleted,
+    record_order_items, record_order_item_changed, record_order_item_deleted
+)
+
+# Modelos que forman parte del snapshot del menú
+MENU_MODELS = [
+    Category, Product, ProductTag, Ingredient, ProductIngredient,
+    HeroSection, AboutSection, ContactInfo, FeaturedProduct, SiteConfig,
+]
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Category)
+def product_counts_changed(sender, **kwargs):
+    invalidate_product_counts()
+
+
+@receiver([post_save, post_delete], sender=Product)
+def product_search_changed(sender, instance, **kwargs):
+    reindex_products([instance.id])
+
+
+@receiver(post_save, sender=Category)
+def category_search_changed(sender, instance, **kwargs):
+    reindex_products(instance.products.values_list('id', flat=True))
+
+
+@receiver([post_save, post_delete], sender=ProductTag)
+def tag_search_changed(sender, instance, **kwargs):
+    reindex_products([instance.product_id])
+
+
+# Rollups de ventas del dashboard
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        record_order_created(instance)
+    else:
+        record_order_changed(instance)
+
+
+# Eventos en vivo para cocina y para el dueño del pedido
+@receiver(post_save, sender=Order)
+def order_event(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        publish_order_event(instance, 'order.created')
+    elif getattr(instance, '_loaded_values', {}).get('status') != instance.status:
+        publish_order_event(instance, 'order.status')
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
+    record_order_deleted(instance)
+
+
+@receiver(post_save, sender=OrderItem)
+def order_item_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        record_order_items([instance], instance.order.created_at)
+    else:
+        record_order_item_changed(instance)
+
+
+@receiver(post_delete, sender=OrderItem)
+def order_item_deleted(sender, instance, **kwargs):
+    record_order_item_deleted(instance)
+
+
+def menu_changed(sender, **kwargs):
+    bump_snapshot_version()
+
+
+for model in MENU_MODELS:
+    post_save.connect(menu_changed, sender=model, dispatch_uid=f'menu-snapshot-{model.__name__}-save')
+    post_delete.connect(menu_changed, sender=model, dispatch_uid=f'menu-snapshot-{model.__name__}-delete')
+
+
+# Catálogo de precios compilado (api/pricing.py)
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Ingredient)
+@receiver([post_save, post_delete], sender=ProductIngredient)
+def pricing_catalog_changed(sender, **kwargs):
+    catalog_changed()
+
+
+# Tokens resueltos en cache: fuera al cerrar sesión (token borrado) y al modificar o borrar el usuario
+@receiver([post_save, post_delete], sender=Token)
+def token_changed(sender, instance, **kwargs):
+    token_cache.invalidate_key(instance.key)
+    token_cache.invalidate_user(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=User)
+def token_user_changed(sender, instance, **kwargs):
+    token_cache.invalidate_user(instance.pk)
+
+
+# Variantes WebP/JPEG de imágenes subidas
+def image_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    for model_label, field_name in IMAGE_FIELDS:
+        if model_label == sender._meta.label and needs_variants(instance, field_name):
+            schedule_variants(instance, model_label, field_name)
+
+
+for model_label in {model_label for model_label, _ in IMAGE_FIELDS}:
+    post_save.connect(image_saved, sender=apps.get_model(model_label), dispatch_uid=f'image-variants-{model_label}')
@@ -0,0 +1,38 @@
+"""
+SQLite para escrituras concurrentes (ENGINE 'api.sqlite_backend').
+
+Igual que el backend sqlite3 de Django, más:
+
+- OPTIONS['pragmas']: PRAGMAs aplicados a cada conexión nueva (journal_mode=WAL,
+  synchronous=NORMAL, mmap_size, busy_timeout...).
+- OPTIONS['transaction_mode']: 'IMMEDIATE' abre las transacciones con BEGIN IMMEDIATE. Con
+  BEGIN a secas la transacción toma el lock de escritura recién en su primer INSERT/UPDATE,
+  y si otra escritura ya lo tiene SQLite responde "database is locked" sin esperar el
+  busy_timeout (no puede esperar sin arriesgar un deadlock).
+- is_usable() consulta la conexión, así CONN_HEALTH_CHECKS descarta conexiones rotas.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = params.pop('pragmas', {})
+        self.transaction_mode = params.pop('transaction_mode', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def is_usable(self):
+        try:
+            self.connection.execute('SELECT 1')
+        except self.Database.Error:
+            return False
+        return True
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f'BEGIN {self.transaction_mode}' if self.transaction_mode else 'BEGIN')
@@ -0,0 +1,54 @@
+import hashlib
+import os
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+HASH_LENGTH = 12
+# 'papas.3fa9c0b1d2e4.png' y sus variantes 'papas.3fa9c0b1d2e4.card.webp' (api/images.py)
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{%d}(\.[a-z]+)?\.\w+$' % HASH_LENGTH)
+
+
+def is_hashed_name(name):
+    return bool(HASHED_NAME_RE.search(name))
+
+
+def file_hash(content):
+    sha = hashlib.sha256()
+    for chunk in content.chunks():
+        sha.update(chunk)
+    content.seek(0)
+    return sha.hexdigest()[:HASH_LENGTH]
+
+
+class HashedFileSystemStorage(FileSystemStorage):
+    """
+    FileSystemStorage que agrega un hash del contenido al nombre de los archivos subidos.
+
+    Un archivo con el mismo nombre nunca cambia de contenido, así api/media.py puede servirlo
+    con caché inmutable. Subir dos veces el mismo archivo reutiliza el existente. Los nombres
+    que ya traen hash (p.ej. las variantes de originales con hash) se guardan tal cual; api/images.py
+    registra el nombre que devuelve save().
+    """
+
+    def hashed_name(self, name, content, max_length=None):
+        dir_name, file_name = os.path.split(name)
+        root, ext = os.path.splitext(file_name)
+        suffix = f'.{file_hash(content)}{ext}'
+        if max_length is not None:
+            # Recortar el nombre original y no el hash (get_available_name recortaría el final de la raíz)
+            available = max_length - len(os.path.join(dir_name, suffix))
+            root = root[:max(available, 1)]
+        return os.path.join(dir_name, root + suffix)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        if not is_hashed_name(name):
+            name = self.hashed_name(name, content, max_length)
+            if self.exists(name):
+                return name
+        return super().save(name, content, max_length)
@@ -1,3 +1,1102 @@
-from django.test import TestCase
+import asyncio
+import csv
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer as DRFJSONRenderer
+from rest_framework.test import APIClient
+
+from products.models import Category, Product, ProductTag, Ingredient, ProductIngredient
+from .auth_backends import token_cache
+from .events import Broker
+from .log_handlers import SampledDebugFilter
+from .models import Order, OrderItem, OrderItemExtra, OrderItemIngredient, HeroSection, HourlySalesRollup, Review
+from .pricing import get_catalog
+from .renderers import FastJSONRenderer
+from .rollups import hour_bucket, rebuild_rollups, refresh_hour, sketch_add, sketch_estimate
+from .search import InvertedIndex, reindex_products, search_product_ids
+from .replica import AnalyticsRouter, analytics_db, analytics_reads, refresh_replica
+from .serializers import CreateOrderSerializer
+from .timeseries import dashboard_series
+from .transactions import atomic_with_retry
+
+
+def build_catalog(products=6):
+    """Crear una categoría con productos que tienen un ingrediente por defecto y uno extra."""
+    category = Category.objects.create(name='Hamburguesas', icon='🍔')
+    queso = Ingredient.objects.create(name='Queso')
+    tocino = Ingredient.objects.create(name='Tocino')
+    catalog = []
+    for i in range(products):
+        product = Product.objects.create(
+            name=f'Producto {i}', description='Rico', price=Decimal('1000.00'), category=category
+        )
+        ProductIngredient.objects.create(product=product, ingredient=queso, default_included=True)
+        ProductIngredient.objects.create(
+            product=product, ingredient=tocino, default_included=False, extra_cost=Decimal('500.00')
+        )
+        catalog.append(product)
+    return catalog, queso, tocino
+
+
+def order_payload(products, extra):
+    return {
+        'customer_name': 'Ana',
+        'customer_email': 'ana@example.com',
+        'customer_phone': '+56911111111',
+        'delivery_street': 'Calle',
+        'delivery_number': '123',
+        'delivery_city': 'Santiago',
+        'delivery_region': 'RM',
+        'items': [
+            {'product_id': str(p.id), 'quantity': '2', 'extras': {str(extra.id): '1'}}
+            for p in products
+        ],
+    }
+
+
+class CreateOrderSerializerTests(TestCase):
+    def setUp(self):
+        self.products, self.queso, self.tocino = build_catalog()
+
+    def _save(self, products):
+        serializer = CreateOrderSerializer(data=order_payload(products, self.tocino))
+        serializer.is_valid(raise_exception=True)
+        with CaptureQueriesContext(connection) as ctx:
+            order = serializer.save()
+        return order, len(ctx.captured_queries)
+
+    def test_create_prices_items_extras_and_ingredients(self):
+        order, _ = self._save(self.products[:2])
+        self.assertEqual(order.total_amount, Decimal('6000.00'))
+        self.assertEqual(order.items.count(), 2)
+        item = order.items.get(product=self.products[0])
+        self.assertEqual(item.unit_price, Decimal('1500.00'))
+        self.assertEqual(item.total_price, Decimal('3000.00'))
+        extra = item.extras.get()
+        self.assertEqual((extra.ingredient_name, extra.quantity, extra.total_price), ('Tocino', 1, Decimal('500.00')))
+        included = {row.ingredient_name: row.is_included for row in item.ingredients.all()}
+        self.assertEqual(included, {'Queso': True, 'Tocino': False})
+
+    def test_create_query_count_is_independent_of_cart_size(self):
+        _, small = self._save(self.products[:1])
+        _, large = self._save(self.products)
+        self.assertEqual(small, large)
+        # 9 para el pedido y sus filas (con la verificación de que los productos siguen existiendo)
+        # + 5 para los rollups de ventas del dashboard
+        self.assertLessEqual(large, 14)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_validate_resolves_catalog_once_for_create(self):
+        # La primera validación verifica la versión y compila el catálogo; las siguientes lo leen de memoria
+        with self.assertNumQueries(3):
+            CreateOrderSerializer(data=order_payload(self.products, self.tocino)).is_valid(raise_exception=True)
+        serializer = CreateOrderSerializer(data=order_payload(self.products, self.tocino))
+        with self.assertNumQueries(0):
+            serializer.is_valid(raise_exception=True)
+        with CaptureQueriesContext(connection) as ctx:
+            serializer.save()
+        product_queries = [q['sql'] for q in ctx.captured_queries if 'FROM "products_' in q['sql']]
+        # Solo la verificación de existencia dentro de la transacción; precios e ingredientes salen del catálogo
+        self.assertEqual(len(product_queries), 1)
+        self.assertTrue(product_queries[0].startswith('SELECT "products_product"."id" FROM "products_product"'))
+
+    def test_product_deleted_by_another_worker_is_a_validation_error(self):
+        get_catalog()
+        # Otro worker borra el producto: el catálogo de este proceso aún no lo sabe
+        with mock.patch('api.signals.catalog_changed'):
+            Product.objects.filter(id=self.products[1].id).delete()
+        response = APIClient().post('/api/orders/', order_payload(self.products[:2], self.tocino), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(f'Item 1: Producto con ID {self.products[1].id} no existe', str(response.json()))
+        self.assertEqual(Order.objects.count(), 0)
+
+    def test_validate_rejects_unknown_product(self):
+        payload = order_payload(self.products[:1], self.tocino)
+        payload['items'].append({'product_id': '9999', 'quantity': '1'})
+        serializer = CreateOrderSerializer(data=payload)
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('Item 1: Producto con ID 9999 no existe', str(serializer.errors))
+
+
+class PricingCatalogTests(TestCase):
+    def setUp(self):
+        self.products, self.queso, self.tocino = build_catalog(products=2)
+        self.client = APIClient()
+
+    def _quote(self, product, extra_ids):
+        return self.client.post(
+            f'/api/products/{product.id}/calculate_price/', {'extra_ids': extra_ids}, format='json'
+        )
+
+    def test_quote_uses_optional_extras_only(self):
+        response = self._quote(self.products[0], [self.tocino.id, self.queso.id, self.tocino.id])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            (response.data['base_price'], response.data['extras_total'], response.data['total']),
+            (Decimal('1000.00'), Decimal('500.00'), Decimal('1500.00')),
+        )
+        self.assertEqual(self._quote(self.products[0], ['x']).status_code, 400)
+
+    def test_warm_catalog_quotes_without_queries(self):
+        self._quote(self.products[0], [])
+        with self.assertNumQueries(0):
+            self.assertEqual(self._quote(self.products[1], [self.tocino.id]).status_code, 200)
+
+    def test_catalog_writes_swap_the_compiled_catalog(self):
+        before = get_catalog()
+        ProductIngredient.objects.filter(ingredient=self.tocino).update(extra_cost=Decimal('750.00'))
+        # update() no envía señales: el catálogo compilado sigue vigente
+        self.assertIs(get_catalog(), before)
+        tocino = ProductIngredient.objects.get(product=self.products[0], ingredient=self.tocino)
+        tocino.save()
+        self.assertEqual(self._quote(self.products[0], [self.tocino.id]).data['total'], Decimal('1750.00'))
+        self.assertIsNot(get_catalog(), before)
+
+        self.products[1].is_active = False
+        self.products[1].save()
+        self.assertEqual(self._quote(self.products[1], []).status_code, 404)
+
+    def test_writes_from_other_processes_are_seen_after_the_check_interval(self):
+        self.assertEqual(self._quote(self.products[0], [self.tocino.id]).data['total'], Decimal('1500.00'))
+        # Otro worker: sus señales no llegan a este proceso, solo cambia la base
+        with mock.patch('api.signals.catalog_changed'):
+            tocino = ProductIngredient.objects.get(product=self.products[0], ingredient=self.tocino)
+            tocino.extra_cost = Decimal('750.00')
+            tocino.save()
+        self.assertEqual(self._quote(self.products[0], [self.tocino.id]).data['total'], Decimal('1500.00'))
+        later = time.monotonic() + settings.PRICING_CATALOG_CHECK_INTERVAL + 1
+        with mock.patch('time.monotonic', return_value=later):
+            self.assertEqual(self._quote(self.products[0], [self.tocino.id]).data['total'], Decimal('1750.00'))
+
+        # update() no cambia updated_at: la edad máxima acota cuánto sigue vigente el catálogo
+        Product.objects.filter(id=self.products[0].id).update(price=Decimal('1100.00'))
+        with mock.patch('time.monotonic', return_value=later + settings.PRICING_CATALOG_MAX_AGE):
+            self.assertEqual(self._quote(self.products[0], []).data['total'], Decimal('1100.00'))
+
+
+class SampledDebugFilterTests(TestCase):
+    def _record(self, level):
+        return logging.LogRecord('api.views', level, __file__, 1, 'payload %s', ({},), None)
+
+    def test_debug_records_are_sampled_and_info_always_passes(self):
+        self.assertFalse(SampledDebugFilter(rate=0).filter(self._record(logging.DEBUG)))
+        self.assertTrue(SampledDebugFilter(rate=1).filter(self._record(logging.DEBUG)))
+        self.assertTrue(SampledDebugFilter(rate=0).filter(self._record(logging.INFO)))
+
+
+class ProductEndpointQueryBudgetTests(TestCase):
+    """Los endpoints de lectura de productos deben costar lo mismo con 10, 100 o 1000 productos."""
+    sizes = (10, 100, 1000)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Hamburguesas', icon='🍔')
+        self.ingredients = [Ingredient.objects.create(name='Queso'), Ingredient.objects.create(name='Tocino')]
+
+    def _grow_catalog(self, size):
+        missing = size - Product.objects.count()
+        products = Product.objects.bulk_create([
+            Product(name=f'Hamburguesa {i}', description='Con queso', price=Decimal('1000.00'), category=self.category)
+            for i in range(missing)
+        ])
+        ProductTag.objects.bulk_create([ProductTag(product=p, name='Popular') for p in products])
+        ProductIngredient.objects.bulk_create([
+            ProductIngredient(product=p, ingredient=ingredient) for p in products for ingredient in self.ingredients
+        ])
+        reindex_products(p.id for p in products)
+
+    def assertQueryBudget(self, url, budget):
+        for size in self.sizes:
+            self._grow_catalog(size)
+            with self.subTest(url=url, products=size), self.assertNumQueries(budget):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_list(self):
+        self.assertQueryBudget('/api/products/', 3)
+
+    def test_list_filtered_by_category_and_search(self):
+        self.assertQueryBudget('/api/products/?category=Hamburguesas&search=queso', 4)
+
+    def test_featured(self):
+        self.assertQueryBudget('/api/products/featured/', 3)
+
+    def test_search(self):
+        self.assertQueryBudget('/api/products/search/?q=hamburguesa', 4)
+
+    def test_category_products(self):
+        self.client.force_authenticate(User.objects.create_user('admin', is_staff=True))
+        self.assertQueryBudget(f'/api/categories/{self.category.id}/products/', 4)
+
+
+class CategoryProductsCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.products, _, _ = build_catalog(products=3)
+        self.category = self.products[0].category
+        for i in range(5):
+            Category.objects.create(name=f'Categoría {i}')
+
+    def test_list_counts_active_products_in_one_query(self):
+        Product.objects.filter(id=self.products[0].id).update(is_active=False)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/categories/')
+        counts = {row['id']: row['products_count'] for row in response.json()}
+        self.assertEqual(counts[self.category.id], 2)
+        self.assertEqual(len(counts), 6)
+
+    def test_nested_category_count_is_cached_and_invalidated_on_product_save(self):
+        url = f'/api/products/{self.products[0].id}/'
+        self.assertEqual(self.client.get(url).json()['category']['products_count'], 3)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url)
+        self.assertFalse(any('COUNT(' in q['sql'] for q in ctx.captured_queries))
+
+        self.products[1].is_active = False
+        self.products[1].save()
+        self.assertEqual(self.client.get(url).json()['category']['products_count'], 2)
+
+
+class MenuSnapshotTests(TestCase):
+    url = '/api/menu/snapshot/'
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.products, _, _ = build_catalog(products=2)
+
+    def test_snapshot_contains_catalog_and_site_content(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([p['name'] for p in data['products']], ['Producto 0', 'Producto 1'])
+        self.assertEqual(data['categories'][0]['products_count'], 2)
+        self.assertIsNone(data['hero'])
+        self.assertTrue(data['site_config']['show_reviews'])
+
+    def test_repeat_visit_gets_304_without_database_work(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_catalog_write_changes_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.products[0].name = 'Nuevo nombre'
+        self.products[0].save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['products'][0]['name'], 'Nuevo nombre')
+
+    def test_version_expires_for_writes_seen_by_other_workers(self):
+        etag = self.client.get(self.url)['ETag']
+        # Escritura de otro proceso: las señales no llegan al cache de este
+        Product.objects.filter(id=self.products[0].id).update(name='Desde otro worker')
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with mock.patch('time.time', return_value=time.time() + settings.API_CACHE_TIMEOUT + 1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['products'][0]['name'], 'Desde otro worker')
+
+
+class CachedResponseMixinTests(TestCase):
+    url = '/api/hero/active/'
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.hero = HeroSection.objects.create(title='Hola', subtitle='Bienvenidos')
+
+    def test_second_request_is_served_from_cache(self):
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.json()['title'], 'Hola')
+
+    def test_browsable_api_html_is_not_served_to_json_clients(self):
+        html = self.client.get(self.url, HTTP_ACCEPT='text/html')
+        self.assertTrue(html['Content-Type'].startswith('text/html'))
+        response = self.client.get(self.url, HTTP_ACCEPT='application/json, text/plain, */*')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertTrue(response['Content-Type'].startswith('application/json'))
+        self.assertEqual(self.client.get(self.url, HTTP_ACCEPT='text/html')['X-Cache'], 'HIT')
+
+    def test_model_write_invalidates_cached_response(self):
+        self.client.get(self.url)
+        self.hero.title = 'Nuevo'
+        self.hero.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['title'], 'Nuevo')
+
+    def test_stats_are_admin_only(self):
+        self.client.get(self.url)
+        self.client.get(self.url)
+        self.assertIn(self.client.get('/api/cache/stats/').status_code, (401, 403))
+        self.client.force_authenticate(User.objects.create_user('admin', is_staff=True))
+        stats = self.client.get('/api/cache/stats/').json()['endpoints']['HeroSectionViewSet.active']
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (1, 1, 0.5))
+
+
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        bebidas = Category.objects.create(name='Bebidas')
+        postres = Category.objects.create(name='Postres')
+        self.limonada = Product.objects.create(
+            name='Limonada', description='Jugo natural de limón', price=Decimal('1500'), category=bebidas
+        )
+        self.pie = Product.objects.create(
+            name='Pie de Limón', description='Postre de la casa', price=Decimal('2500'), category=postres
+        )
+        self.brownie = Product.objects.create(
+            name='Brownie', description='Chocolate', price=Decimal('2000'), category=postres
+        )
+        ProductTag.objects.create(product=self.brownie, name='Sin gluten')
+
+    def test_accent_insensitive_prefix_search(self):
+        self.assertEqual(search_product_ids('limon'), [self.limonada.id, self.pie.id])
+        self.assertEqual(search_product_ids('LIMÓN pie'), [self.pie.id])
+        self.assertEqual(search_product_ids('glu'), [self.brownie.id])
+        self.assertEqual(search_product_ids('chocolate postres'), [self.brownie.id])
+        self.assertEqual(search_product_ids('   '), [])
+
+    def test_index_follows_product_and_category_writes(self):
+        self.brownie.name = 'Torta'
+        self.brownie.save()
+        self.assertEqual(search_product_ids('brownie'), [])
+        self.pie.category.name = 'Dulces'
+        self.pie.category.save()
+        self.assertEqual(set(search_product_ids('dulces')), {self.pie.id, self.brownie.id})
+        self.pie.delete()
+        self.assertEqual(search_product_ids('pie'), [])
+
+    def test_python_index_matches_fts(self):
+        documents = [
+            (self.limonada.id, {'name': 'Limonada', 'category': 'Bebidas', 'tags': '', 'description': 'Jugo natural de limón'}),
+            (self.pie.id, {'name': 'Pie de Limón', 'category': 'Postres', 'tags': '', 'description': 'Postre'}),
+        ]
+        index = InvertedIndex(documents)
+        self.assertEqual(index.search('limon'), search_product_ids('limon'))
+        self.assertEqual(index.search('post limo'), [self.pie.id])
+
+    def test_search_endpoint_returns_ranked_active_products(self):
+        self.limonada.is_active = False
+        self.limonada.save()
+        response = self.client.get('/api/products/search/?q=limon')
+        self.assertEqual([p['id'] for p in response.json()], [self.pie.id])
+
+
+class SalesRollupTests(TestCase):
+    def setUp(self):
+        self.products, _, self.tocino = build_catalog(products=2)
+
+    def _order(self, email, products):
+        payload = order_payload(products, self.tocino)
+        payload['customer_email'] = email
+        serializer = CreateOrderSerializer(data=payload)
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+
+    def test_rollups_follow_creation_and_status_changes(self):
+        first = self._order('ana@example.com', self.products)
+        self._order('ana@example.com', self.products[:1])
+        self._order('beto@example.com', self.products[:1])
+        first.status = 'cancelled'
+        first.save()
+
+        series = dashboard_series(1)
+        current = series['ordersByDay'][-1]
+        self.assertEqual(current['count'], 3)
+        self.assertEqual(series['revenueByDay'][-1]['total'], 6000.0)
+        self.assertEqual(series['customersByDay'][-1]['count'], 2)
+        self.assertEqual(series['statusDistribution'], {'pending': 2, 'cancelled': 1})
+        self.assertEqual(series['topProducts'][0], {'product': 'Producto 0', 'quantity': 6})
+
+    def test_dashboard_reads_rollups_only_and_matches_rebuild(self):
+        for i in range(3):
+            self._order(f'cliente{i}@example.com', self.products)
+        Order.objects.last().delete()
+        incremental = dashboard_series(7)
+        rebuild_rollups()
+        self.assertEqual(dashboard_series(7), incremental)
+        with CaptureQueriesContext(connection) as ctx:
+            dashboard_series(30)
+        tables = ' '.join(q['sql'] for q in ctx.captured_queries)
+        self.assertNotIn('"api_order"', tables)
+        self.assertNotIn('"api_orderitem"', tables)
+
+    def test_sketch_estimates_distinct_customers(self):
+        sketch = None
+        for i in range(200):
+            sketch = sketch_add(sketch, f'cliente{i % 50}@example.com')
+        self.assertAlmostEqual(sketch_estimate(sketch), 50, delta=2)
+
+
+class TimeSeriesTests(TestCase):
+    def setUp(self):
+        self.products, _, self.tocino = build_catalog(products=1)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('admin', is_staff=True))
+
+    def test_granularities_and_arbitrary_ranges(self):
+        serializer = CreateOrderSerializer(data=order_payload(self.products, self.tocino))
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        today = timezone.localdate()
+        monday = today - timedelta(days=today.weekday())
+
+        data = self.client.get('/api/orders/admin_stats/', {'range': 'month', 'granularity': 'week'}).json()
+        self.assertEqual(data['ordersByDay'][-1], {'date': monday.isoformat(), 'count': 1})
+        self.assertEqual(data['usersByDay'][-1], {'date': monday.isoformat(), 'count': 1})
+
+        since = (today - timedelta(days=2)).isoformat()
+        data = self.client.get('/api/orders/admin_stats/', {'since': since, 'until': today.isoformat()}).json()
+        self.assertEqual(data['rangeDays'], 3)
+        self.assertEqual(data['revenueByDay'], [{'date': today.isoformat(), 'total': 3000.0}])
+
+        # Por hora se completan las 24 horas, incluida la actual
+        users = self.client.get('/api/users/stats/', {'range': 'day'}).json()['usersByDay']
+        self.assertEqual(len(users), 24)
+        self.assertEqual(users[-1]['count'], 1)
+
+    def test_invalid_window_is_rejected(self):
+        for params in [{'granularity': 'minute'}, {'since': '2024-13-01'}, {'since': '2020-01-01', 'granularity': 'hour'}]:
+            self.assertEqual(self.client.get('/api/users/stats/', params).status_code, 400, params)
+
+
+class BucketCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        products, _, tocino = build_catalog(products=1)
+        serializer = CreateOrderSerializer(data=order_payload(products, tocino))
+        serializer.is_valid(raise_exception=True)
+        self.order = serializer.save()
+        past = timezone.now() - timedelta(days=2)
+        Order.objects.filter(pk=self.order.pk).update(created_at=past)
+        rebuild_rollups()
+        self.order.refresh_from_db()
+        self.day = timezone.localtime(past).date().isoformat()
+
+    def revenue(self):
+        return {row['date']: row['total'] for row in dashboard_series(7)['revenueByDay']}
+
+    def customers(self):
+        return {row['date']: row['count'] for row in dashboard_series(7)['customersByDay']}
+
+    def test_closed_buckets_are_cached_until_their_rollups_change(self):
+        self.assertEqual(self.customers()[self.day], 1)
+        # Cambio fuera de la firma (ni updated_at ni sumas): el bucket completo sigue saliendo del cache
+        HourlySalesRollup.objects.update(customers_sketch=None)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.customers()[self.day], 1)
+        rollup_queries = [q['sql'] for q in ctx.captured_queries if 'api_hourlysalesrollup' in q['sql']]
+        # Las firmas de los días completos y las métricas del día abierto (hoy), sin sketches de los cacheados
+        self.assertEqual(len(rollup_queries), 2)
+        self.assertNotIn('customers_sketch', rollup_queries[0])
+        self.assertEqual(rollup_queries[1].count('"hour" >='), 1)
+
+        self.order.status = 'cancelled'
+        self.order.save()
+        self.assertNotIn(self.day, self.revenue())
+
+    def test_rollup_writes_from_other_workers_invalidate_buckets(self):
+        self.assertEqual(self.revenue()[self.day], 3000.0)
+        # Otro proceso cancela el pedido: aquí no corre ninguna señal, solo cambia la base
+        Order.objects.filter(pk=self.order.pk).update(status='cancelled')
+        refresh_hour(hour_bucket(self.order.created_at))
+        self.assertNotIn(self.day, self.revenue())
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.products, _, self.tocino = build_catalog(products=1)
+        self.user = User.objects.create_user('ana', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for _ in range(5):
+            self._order()
+        # Mismo created_at para todos: el desempate por id debe mantener el orden
+        Order.objects.update(created_at=Order.objects.first().created_at)
+
+    def _order(self):
+        serializer = CreateOrderSerializer(data=order_payload(self.products, self.tocino))
+        serializer.is_valid(raise_exception=True)
+        return serializer.save(user=self.user)
+
+    def test_legacy_mode_keeps_plain_list(self):
+        response = self.client.get('/api/orders/my/')
+        self.assertEqual(len(response.json()), 5)
+
+    def test_cursor_walk_is_stable_under_inserts(self):
+        expected = list(Order.objects.order_by('-id').values_list('id', flat=True))
+        page = self.client.get('/api/orders/my/', {'page_size': 2}).json()
+        self.assertIsNone(page['previous'])
+        seen = [o['id'] for o in page['results']]
+        first_next = page['next']
+        self._order()
+        while page['next']:
+            page = self.client.get(page['next']).json()
+            seen += [o['id'] for o in page['results']]
+        self.assertEqual(seen, expected)
+
+        second = self.client.get(first_next).json()
+        previous = self.client.get(second['previous']).json()
+        self.assertEqual([o['id'] for o in previous['results']], expected[:2])
+
+    @override_settings(API_PAGINATION_LEGACY=False)
+    def test_products_always_paginated_without_legacy_flag(self):
+        response = self.client.get('/api/products/', {'page_size': 'x'})
+        self.assertEqual([p['id'] for p in response.json()['results']], [self.products[0].id])
+        self.assertEqual(self.client.get('/api/products/', {'cursor': 'basura'}).status_code, 404)
+
+
+class OrderExportTests(TestCase):
+    def setUp(self):
+        self.products, _, self.tocino = build_catalog(products=3)
+        for status in ('pending', 'delivered'):
+            serializer = CreateOrderSerializer(data=order_payload(self.products, self.tocino))
+            serializer.is_valid(raise_exception=True)
+            serializer.save(status=status)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('admin', password='x', is_staff=True))
+
+    def _body(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_export_is_staff_only(self):
+        self.client.force_authenticate(User.objects.create_user('ana', password='x'))
+        self.assertEqual(self.client.get('/api/orders/export/').status_code, 403)
+
+    def test_csv_has_one_row_per_item_with_extras(self):
+        response = self.client.get('/api/orders/export/')
+        rows = list(csv.DictReader(StringIO(self._body(response))))
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[0]['extras'], 'Tocino x1')
+        self.assertEqual(rows[0]['item_total'], '3000.00')
+
+    def test_ndjson_filters_by_status_and_date(self):
+        response = self.client.get('/api/orders/export/', {'output': 'ndjson', 'status': 'delivered'})
+        lines = [json.loads(line) for line in self._body(response).splitlines()]
+        self.assertEqual({line['status'] for line in lines}, {'delivered'})
+        self.assertEqual(len(lines), 3)
+        response = self.client.get('/api/orders/export/', {'output': 'ndjson', 'until': '2000-01-01'})
+        self.assertEqual(self._body(response), '')
+        # until incluye el día completo, como en el dashboard
+        today = timezone.localdate().isoformat()
+        response = self.client.get('/api/orders/export/', {'output': 'ndjson', 'since': today, 'until': today})
+        self.assertEqual(len(self._body(response).splitlines()), 6)
+        self.assertEqual(self.client.get('/api/orders/export/', {'until': '2024-13-01'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/orders/export/', {'status': 'perdido'}).status_code, 400)
+
+    def test_query_count_depends_on_chunks_not_rows(self):
+        out = StringIO()
+        with CaptureQueriesContext(connection) as ctx:
+            call_command('export_orders', '--format', 'ndjson', '--chunk-size', '2', stdout=out, stderr=StringIO())
+        # Un solo SELECT de items leído por bloques + una consulta de extras por bloque de 2 items
+        self.assertEqual(len(ctx.captured_queries), 4)
+        self.assertEqual(len(out.getvalue().splitlines()), 6)
+
+
+class OrderEventsTests(TestCase):
+    def setUp(self):
+        self.products, _, self.tocino = build_catalog(products=1)
+        self.user = User.objects.create_user('ana', password='x')
+        self.cook = User.objects.create_user('cocina', password='x', is_staff=True)
+
+    def _auth(self, user):
+        return {'authorization': f'Token {Token.objects.get_or_create(user=user)[0].key}'}
+
+    def _create_order(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            serializer = CreateOrderSerializer(data=order_payload(self.products, self.tocino))
+            serializer.is_valid(raise_exception=True)
+            return serializer.save(user=self.user)
+
+    def _set_status(self, order, new_status):
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = new_status
+            order.save()
+
+    async def _next_event(self, stream):
+        while True:
+            chunk = (await asyncio.wait_for(anext(stream), 1)).decode()
+            if chunk.startswith('event:'):
+                return chunk.split('\n')[0][len('event: '):], json.loads(chunk.split('data: ', 1)[1])
+
+    async def test_owner_and_kitchen_receive_events(self):
+        order = await sync_to_async(self._create_order)()
+        owner = await self.async_client.get('/api/orders/events/', headers=await sync_to_async(self._auth)(self.user))
+        kitchen = await self.async_client.get('/api/orders/events/', headers=await sync_to_async(self._auth)(self.cook))
+        self.assertEqual(owner['Content-Type'], 'text/event-stream')
+        owner_stream, kitchen_stream = aiter(owner.streaming_content), aiter(kitchen.streaming_content)
+
+        await sync_to_async(self._set_status)(order, 'ready')
+        event_type, event = await self._next_event(owner_stream)
+        self.assertEqual((event_type, event['order']['status']), ('order.status', 'ready'))
+        self.assertEqual((await self._next_event(kitchen_stream))[0], 'order.status')
+
+        await sync_to_async(self._create_order)()
+        self.assertEqual((await self._next_event(kitchen_stream))[0], 'order.created')
+        await owner_stream.aclose()
+        await kitchen_stream.aclose()
+
+    async def test_anonymous_is_rejected(self):
+        response = await self.async_client.get('/api/orders/events/')
+        self.assertEqual(response.status_code, 401)
+
+    def test_wsgi_requests_get_501(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/api/orders/events/').status_code, 501)
+
+    def test_incomplete_broker_fails_when_created(self):
+        class PublishOnlyBroker(Broker):
+            def publish(self, channel, event):
+                pass
+
+        with self.assertRaises(TypeError):
+            PublishOnlyBroker()
+
+
+class MyOrdersConditionalTests(TestCase):
+    def setUp(self):
+        self.products, _, self.tocino = build_catalog(products=1)
+        self.user = User.objects.create_user('ana', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.orders = []
+        for _ in range(3):
+            serializer = CreateOrderSerializer(data=order_payload(self.products, self.tocino))
+            serializer.is_valid(raise_exception=True)
+            self.orders.append(serializer.save(user=self.user))
+
+    def test_unchanged_poll_is_304_with_one_query(self):
+        etag = self.client.get('/api/orders/my/')['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/orders/my/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.orders[0].status = 'ready'
+        self.orders[0].save()
+        response = self.client.get('/api/orders/my/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_depends_on_query(self):
+        etag = self.client.get('/api/orders/my/')['ETag']
+        for params in ({'summary': '1'}, {'since': '2000-01-01T00:00:00'}, {'page_size': '1'}):
+            response = self.client.get('/api/orders/my/', params, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+            repeat = self.client.get('/api/orders/my/', params, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(repeat.status_code, 304)
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get('/api/orders/my/')['Last-Modified']
+        response = self.client.get('/api/orders/my/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_since_returns_only_changed_orders(self):
+        since = Order.objects.get(id=self.orders[2].id).updated_at
+        self.orders[0].status = 'confirmed'
+        self.orders[0].save()
+        response = self.client.get('/api/orders/my/', {'since': since.isoformat()})
+        self.assertEqual([o['id'] for o in response.json()], [self.orders[0].id])
+        self.assertEqual(self.client.get('/api/orders/my/', {'since': 'ayer'}).status_code, 400)
+
+
+class OrderSerializationQueryTests(TestCase):
+    def setUp(self):
+        self.products, _, self.tocino = build_catalog(products=2)
+        self.user = User.objects.create_user('ana', password='x', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _orders(self, count):
+        for _ in range(count):
+            serializer = CreateOrderSerializer(data=order_payload(self.products, self.tocino))
+            serializer.is_valid(raise_exception=True)
+            serializer.save(user=self.user)
+
+    def test_list_query_count_is_independent_of_order_count(self):
+        self._orders(2)
+        # pedidos + items + extras + ingredientes
+        with self.assertNumQueries(4):
+            self.client.get('/api/orders/')
+        self._orders(3)
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/orders/')
+        self.assertEqual(len(response.json()), 5)
+        self.assertIn('ingredients', response.json()[0]['items'][0])
+
+    def test_summary_skips_description_and_ingredients(self):
+        self._orders(3)
+        # agregado del ETag + pedidos + items + extras
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/orders/my/', {'summary': '1'})
+        item = response.json()[0]['items'][0]
+        self.assertNotIn('ingredients', item)
+        self.assertNotIn('product_description', item)
+        self.assertEqual(item['extras'][0]['ingredient_name'], 'Tocino')
+
+
+class FastSerializerGoldenTests(TestCase):
+    def setUp(self):
+        self.products, _, self.tocino = build_catalog(products=3)
+        self.products[0].image = 'products/papas fritas ñ.jpg'
+        self.products[0].save()
+        ProductTag.objects.create(product=self.products[1], name='picante')
+        self.user = User.objects.create_user('ana', password='x', is_staff=True)
+        for i in range(2):
+            payload = order_payload(self.products, self.tocino)
+            payload['notes'] = 'Sin cebolla' if i else ''
+            payload['items'][0]['included_ingredients'] = []
+            serializer = CreateOrderSerializer(data=payload)
+            serializer.is_valid(raise_exception=True)
+            serializer.save(user=self.user)
+        Review.objects.create(user=self.user, rating=5, comment='Muy rico')
+        Review.objects.create(rating=3, comment='Normal')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _compare(self, url, params=None):
+        with override_settings(API_FAST_SERIALIZERS=False):
+            expected = self.client.get(url, params)
+        with override_settings(API_FAST_SERIALIZERS=True):
+            actual = self.client.get(url, params)
+        self.assertEqual(expected.status_code, 200)
+        self.assertEqual(actual.content, expected.content, url)
+
+    def test_fast_output_is_identical(self):
+        for url, params in [
+            ('/api/products/', None), ('/api/products/featured/', None), ('/api/products/search/', {'q': 'prod'}),
+            ('/api/categories/%d/products/' % self.products[0].category_id, None),
+            ('/api/orders/', None), ('/api/orders/', {'summary': '1'}), ('/api/orders/my/', {'summary': '1'}),
+            ('/api/orders/', {'page_size': '1'}), ('/api/reviews/', None),
+        ]:
+            self._compare(url, params)
+        with override_settings(TIME_ZONE='UTC'):
+            self._compare('/api/reviews/')
+
+
+class FastJSONRendererTests(TestCase):
+    def setUp(self):
+        self.products, _, self.tocino = build_catalog(products=2)
+        serializer = CreateOrderSerializer(data=order_payload(self.products, self.tocino))
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('admin', password='x', is_staff=True))
+
+    def test_orjson_output_matches_stdlib(self):
+        for url in ['/api/orders/', '/api/products/', '/api/orders/admin_stats/', '/api/menu/snapshot/']:
+            with override_settings(API_JSON_BACKEND='stdlib'):
+                cache.clear()
+                expected = self.client.get(url).content
+            with override_settings(API_JSON_BACKEND='orjson'):
+                cache.clear()
+                self.assertEqual(self.client.get(url).content, expected, url)
+        data = {'texto': 'línea\u2028nueva', 'precio': Decimal('10.50'), 'claves': {1: 'uno'}}
+        with override_settings(API_JSON_BACKEND='orjson'):
+            fast = FastJSONRenderer().render(data)
+        self.assertEqual(fast, DRFJSONRenderer().render(data))
+
+    @override_settings(API_JSON_BACKEND='orjson')
+    def test_parser_accepts_json_and_reports_errors_like_drf(self):
+        response = self.client.patch(
+            '/api/orders/%d/update_status/' % Order.objects.get().id, {'status': 'ready'}, format='json'
+        )
+        self.assertEqual(response.json()['status'], 'ready')
+        response = self.client.generic('PATCH', '/api/orders/1/update_status/', '{"status": ', 'application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('JSON parse error', response.json()['detail'])
+
+
+class ImageVariantsTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root, IMAGE_VARIANTS_ASYNC=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.category = Category.objects.create(name='Hamburguesas', icon='🍔')
+
+    def upload(self, width=1200, height=800):
+        buffer = BytesIO()
+        Image.new('RGB', (width, height), 'orange').save(buffer, 'PNG')
+        return SimpleUploadedFile('papas.png', buffer.getvalue(), content_type='image/png')
+
+    def test_upload_generates_variants_and_srcset(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(
+                name='Papas', price=Decimal('1500.00'), category=self.category, image=self.upload()
+            )
+        product.refresh_from_db()
+        self.assertEqual(product.image_variants['source'], product.image.name)
+        self.assertEqual(product.image_variants['widths'], {'thumb': 200, 'card': 480})
+        for variant in ('thumb', 'card'):
+            for extension in ('webp', 'jpeg'):
+                name = product.image.name.rsplit('.', 1)[0] + f'.{variant}.{extension}'
+                self.assertEqual(product.image_variants['files'][variant][extension], name)
+                with default_storage.open(name) as stored:
+                    self.assertEqual(Image.open(stored).width, product.image_variants['widths'][variant])
+
+        srcset = APIClient().get(f'/api/products/{product.id}/').json()['image_srcset']
+        self.assertRegex(srcset['webp'], r'^http://testserver/media/products/\S+\.thumb\.webp 200w, \S+\.card\.webp 480w$')
+        self.assertIn('.card.jpeg 480w', srcset['jpeg'])
+
+    def test_small_original_and_replaced_image(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(
+                name='Papas', price=Decimal('1500.00'), category=self.category, image=self.upload(width=150, height=100)
+            )
+        product.refresh_from_db()
+        # Sin ampliar, y un solo descriptor por ancho
+        self.assertEqual(product.image_variants['widths'], {'thumb': 150, 'card': 150})
+        self.assertEqual(APIClient().get(f'/api/products/{product.id}/').json()['image_srcset']['webp'].count(' 150w'), 1)
+
+        # Imagen nueva sin variantes aún: no se publica un srcset del archivo anterior
+        product.image = self.upload()
+        product.save()
+        self.assertIsNone(APIClient().get(f'/api/products/{product.id}/').json()['image_srcset'])
+
+        call_command('build_image_variants', stdout=StringIO())
+        product.refresh_from_db()
+        self.assertEqual(product.image_variants['widths'], {'thumb': 200, 'card': 480})
+
+    def test_backfilled_variants_of_unhashed_original_resolve(self):
+        # Media subida antes del storage con hash: el nombre del original no lo trae
+        name = FileSystemStorage().save('products/papas.png', self.upload())
+        product = Product.objects.create(name='Papas', price=Decimal('1500.00'), category=self.category, image=name)
+        for _ in range(2):
+            call_command('build_image_variants', '--all', stdout=StringIO())
+        product.refresh_from_db()
+        files = [name for formats in product.image_variants['files'].values() for name in formats.values()]
+        self.assertTrue(all(default_storage.exists(name) for name in files))
+        srcset = APIClient().get(f'/api/products/{product.id}/').json()['image_srcset']
+        for name in files:
+            self.assertIn(f'/media/{name} ', srcset['webp'] + ' ' + srcset['jpeg'] + ' ')
+        # Regenerar con el mismo contenido reutiliza los archivos: no quedan variantes huérfanas
+        self.assertEqual(len(os.listdir(os.path.join(settings.MEDIA_ROOT, 'products'))), 1 + len(files))
+
+
+class MediaServingTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root, MEDIA_SENDFILE='')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.content = bytes(range(256)) * 40
+        self.name = default_storage.save('products/papas.jpg', SimpleUploadedFile('papas.jpg', self.content))
+
+    def test_uploads_get_content_hash_and_are_deduplicated(self):
+        self.assertRegex(self.name, r'^products/papas\.[0-9a-f]{12}\.jpg$')
+        self.assertEqual(default_storage.save('products/papas.jpg', SimpleUploadedFile('papas.jpg', self.content)), self.name)
+        self.assertNotEqual(default_storage.save('products/papas.jpg', SimpleUploadedFile('papas.jpg', b'otro')), self.name)
+
+    def test_cache_headers_and_conditional_requests(self):
+        response = self.client.get(f'/media/{self.name}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(self.client.get(f'/media/{self.name}', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(
+            self.client.get(f'/media/{self.name}', HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304
+        )
+        self.assertEqual(self.client.get('/media/../settings.py').status_code, 404)
+
+    def test_range_requests(self):
+        response = self.client.get(f'/media/{self.name}', HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.content)}')
+        self.assertEqual(b''.join(response.streaming_content), self.content[10:20])
+        response = self.client.get(f'/media/{self.name}', HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content), self.content[-5:])
+        self.assertEqual(self.client.get(f'/media/{self.name}', HTTP_RANGE='bytes=999999-').status_code, 416)
+        # If-Range con otra versión: archivo completo
+        response = self.client.get(f'/media/{self.name}', HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"viejo"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_sendfile_headers(self):
+        with override_settings(MEDIA_SENDFILE='x-accel-redirect'):
+            response = self.client.get(f'/media/{self.name}')
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.name}')
+        self.assertEqual(response.content, b'')
+        with override_settings(MEDIA_SENDFILE='x-sendfile'):
+            response = self.client.get(f'/media/{self.name}')
+        self.assertTrue(response['X-Sendfile'].endswith(self.name))
+
+
+class TokenCacheTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.user = User.objects.create_user('cliente', password='x')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def auth_queries(self, url='/api/orders/my/'):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        return response, [q['sql'] for q in ctx.captured_queries if 'authtoken_token' in q['sql']]
+
+    def test_cached_token_skips_auth_tables(self):
+        response, queries = self.auth_queries()
+        self.assertEqual((response.status_code, len(queries)), (200, 1))
+        response, queries = self.auth_queries()
+        self.assertEqual((response.status_code, queries), (200, []))
+        stats = token_cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['size']), (1, 1, 1))
+
+    def test_logout_and_deactivation_invalidate(self):
+        self.auth_queries()
+        self.assertEqual(self.client.post('/api/auth/logout/').status_code, 200)
+        self.assertEqual(self.client.get('/api/orders/my/').status_code, 401)
+
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.auth_queries()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/orders/my/').status_code, 401)
+
+    @override_settings(AUTH_TOKEN_CACHE_SIZE=1)
+    def test_lru_bound(self):
+        other = Token.objects.create(user=User.objects.create_user('otro', password='x'))
+        self.auth_queries()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {other.key}')
+        self.auth_queries()
+        self.assertEqual((token_cache.stats()['size'], token_cache.stats()['evictions']), (1, 1))
+
+
+class SQLiteTuningTests(TransactionTestCase):
+    def test_connection_pragmas(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            # NORMAL solo con DB_SQLITE_WAL; si no, el FULL por defecto de SQLite
+            expected = 1 if 'synchronous' in connection.settings_dict['OPTIONS']['pragmas'] else 2
+            self.assertEqual(cursor.fetchone()[0], expected)
+            cursor.execute('PRAGMA temp_store')
+            self.assertEqual(cursor.fetchone()[0], 2)  # MEMORY
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], connection.settings_dict['OPTIONS']['pragmas']['busy_timeout'])
+        self.assertTrue(connection.is_usable())
+
+    @override_settings(DB_WRITE_RETRY_DELAY=0, DB_WRITE_RETRIES=2)
+    def test_locked_transaction_is_retried(self):
+        attempts = []
+
+        def create_category():
+            attempts.append(1)
+            Category.objects.create(name=f'Intento {len(attempts)}')
+            if len(attempts) < 3:
+                raise OperationalError('database is locked')
+            return len(attempts)
+
+        self.assertEqual(atomic_with_retry(create_category), 3)
+        # Los intentos fallidos se deshicieron
+        self.assertEqual(list(Category.objects.values_list('name', flat=True)), ['Intento 3'])
+
+    @override_settings(DB_WRITE_RETRY_DELAY=0, DB_WRITE_RETRIES=2)
+    def test_checkout_retry_recreates_every_row(self):
+        products, _, tocino = build_catalog(products=2)
+        bulk_create = OrderItemIngredient.objects.bulk_create
+        attempts = []
+
+        def locked_once(objs, *args, **kwargs):
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise OperationalError('database is locked')
+            return bulk_create(objs, *args, **kwargs)
+
+        serializer = CreateOrderSerializer(data=order_payload(products, tocino))
+        serializer.is_valid(raise_exception=True)
+        with mock.patch.object(OrderItemIngredient.objects, 'bulk_create', side_effect=locked_once):
+            order = serializer.save()
+        self.assertEqual(len(attempts), 2)
+        self.assertEqual(Order.objects.get().id, order.id)
+        self.assertEqual(OrderItemExtra.objects.filter(order_item__order=order).count(), 2)
+        self.assertEqual(OrderItemIngredient.objects.filter(order_item__order=order).count(), 4)
+        self.assertEqual(OrderItemExtra.objects.count() + OrderItemIngredient.objects.count(), 6)
+
+    @override_settings(DB_WRITE_RETRY_DELAY=0, DB_WRITE_RETRIES=2)
+    def test_gives_up_after_retries_and_on_other_errors(self):
+        for message, expected_attempts in [('database is locked', 3), ('no such table: x', 1)]:
+            attempts = []
+
+            def fail():
+                attempts.append(1)
+                raise OperationalError(message)
+
+            with self.assertRaises(OperationalError):
+                atomic_with_retry(fail)
+            self.assertEqual(len(attempts), expected_attempts)
+
+
+class ReplicaTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.primary = os.path.join(directory, 'primary.sqlite3')
+        self.replica = os.path.join(directory, 'replica.sqlite3')
+        with sqlite3.connect(self.primary) as db:
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('CREATE TABLE pedidos (id INTEGER PRIMARY KEY)')
+            db.executemany('INSERT INTO pedidos VALUES (?)', [(i,) for i in range(100)])
+
+    def test_refresh_copies_primary(self):
+        refresh_replica(self.primary, self.replica)
+        db = sqlite3.connect(self.replica)
+        self.addCleanup(db.close)
+        self.assertEqual(db.execute('SELECT count(*) FROM pedidos').fetchone()[0], 100)
+        self.assertEqual(db.execute('PRAGMA journal_mode').fetchone()[0], 'delete')
+
+    def test_stale_or_missing_replica_falls_back_to_primary(self):
+        router = AnalyticsRouter()
+        with override_settings(DB_REPLICA_NAME=self.replica, DB_REPLICA_MAX_STALENESS=60):
+            self.assertEqual(analytics_db(), 'default')
+            refresh_replica(self.primary, self.replica)
+            self.assertEqual(analytics_db(), 'replica')
+            with analytics_reads():
+                self.assertEqual(router.db_for_read(Order), 'replica')
+                self.assertEqual(router.db_for_write(Order), 'default')
+            self.assertIsNone(router.db_for_read(Order))
+            old = os.path.getmtime(self.replica) - 120
+            os.utime(self.replica, (old, old))
+            self.assertEqual(analytics_db(), 'default')
+        self.assertEqual(analytics_db(), 'default')
+
+
+class QueryPlanTests(TestCase):
+    def test_hot_queries_use_indexes(self):
+        # check_query_plans lanza CommandError si alguna consulta recorre la tabla completa
+        call_command('check_query_plans', stdout=StringIO())
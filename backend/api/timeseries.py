@@ -0,0 +1,297 @@
+"""
+Series de tiempo del dashboard (admin_stats, dashboard_data y UserViewSet.stats).
+
+Una ventana es un rango [start, end] en hora local con una granularidad (hour, day o
+week). Las métricas de pedidos salen de HourlySalesRollup: pedidos, pedidos no cancelados,
+ingresos (ya sin cancelados) y clientes distintos por bucket. Los registros de usuarios
+salen de un GROUP BY. Los buckets vacíos se completan en una pasada sobre las llaves de la
+ventana.
+
+Las métricas de pedidos de los buckets completos se guardan en el cache junto con una firma
+de sus filas de rollup (conteo, último updated_at y sumas), que se lee de la base en cada consulta: un bucket
+cacheado vale mientras su firma no cambie, así una escritura hecha por cualquier worker lo
+invalida aunque cada proceso tenga su propio cache. Solo se recalculan el bucket abierto, los
+bordes parciales de la ventana y los buckets con firma nueva.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from typing import NamedTuple
+
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Q, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import HourlySalesRollup
+from .rollups import hour_bucket, sketch_estimate, sketch_merge, status_distribution, top_products
+
+GRANULARITIES = ('hour', 'day', 'week')
+RANGES = {'day': 1, 'week': 7, 'month': 30}
+# Límite de buckets por ventana para que un rango arbitrario no genere series gigantes
+MAX_BUCKETS = 24 * 92
+# Las ventanas terminan en un instante incluido (p.ej. 23:59:59.999999) y los buckets en el siguiente
+_EPSILON = timedelta(microseconds=1)
+
+
+class Window(NamedTuple):
+    start: datetime
+    end: datetime
+    granularity: str
+    # Días que abarca (el 'rangeDays' de las respuestas)
+    days: int
+
+
+def bucket_key(value, granularity):
+    """Inicio del bucket de un datetime: datetime local por hora, fecha del día o del lunes de la semana."""
+    local = timezone.localtime(value)
+    if granularity == 'hour':
+        return local.replace(minute=0, second=0, microsecond=0)
+    if granularity == 'day':
+        return local.date()
+    return local.date() - timedelta(days=local.weekday())
+
+
+def _step(granularity):
+    return {'hour': timedelta(hours=1), 'day': timedelta(days=1), 'week': timedelta(days=7)}[granularity]
+
+
+def bucket_keys(window):
+    """Todas las llaves de la ventana, en orden."""
+    first = bucket_key(window.start, window.granularity)
+    last = bucket_key(window.end, window.granularity)
+    step = _step(window.granularity)
+    count = (last - first) // step + 1
+    return [first + step * i for i in range(count)]
+
+
+def bucket_bounds(key, granularity):
+    """[inicio, fin) del bucket como datetimes locales."""
+    if granularity == 'hour':
+        return key, key + _step(granularity)
+    start = timezone.make_aware(datetime.combine(key, time.min))
+    return start, timezone.make_aware(datetime.combine(key + _step(granularity), time.min))
+
+
+def range_days(range_param):
+    """'day' -> 1, 'week' -> 7, cualquier otro valor -> 30 (mes)."""
+    return RANGES.get((range_param or '').lower(), 30)
+
+
+def last_days(days, now=None):
+    """Ventana del dashboard: las últimas 24 horas (incluida la actual) si days == 1, si no días locales."""
+    now = now or timezone.now()
+    current_hour = timezone.localtime(now).replace(minute=0, second=0, microsecond=0)
+    if days == 1:
+        return Window(current_hour - timedelta(hours=23), now, 'hour', days)
+    return Window((current_hour - timedelta(days=days - 1)).replace(hour=0), now, 'day', days)
+
+
+def window_from_params(params, now=None):
+    """
+    Ventana según ?range=day|week|month, o ?since=&until= (fechas locales, ambas incluidas), con
+    ?granularity=hour|day|week opcional. ValueError si los parámetros no son válidos.
+    """
+    now = now or timezone.now()
+    since, until, granularity = params.get('since'), params.get('until'), params.get('granularity')
+    if granularity is not None and granularity not in GRANULARITIES:
+        raise ValueError(f"granularity debe ser uno de: {', '.join(GRANULARITIES)}")
+    if since or until:
+        try:
+            start_day = parse_date(since) if since else None
+            end_day = parse_date(until) if until else timezone.localdate(now)
+        except ValueError:
+            start_day = end_day = None
+        if start_day is None or end_day is None or start_day > end_day:
+            raise ValueError('since/until deben ser fechas YYYY-MM-DD con since <= until')
+        start = timezone.make_aware(datetime.combine(start_day, time.min))
+        end = min(timezone.make_aware(datetime.combine(end_day, time.max)), now)
+        window = Window(start, end, granularity or 'day', (end_day - start_day).days + 1)
+    else:
+        window = last_days(range_days(params.get('range')), now)
+        if granularity:
+            window = window._replace(granularity=granularity)
+    if window.end < window.start or len(bucket_keys(window)) > MAX_BUCKETS:
+        raise ValueError('Rango vacío o demasiado grande para esa granularidad')
+    return window
+
+
+# Cache de buckets completos
+
+def _bucket_cache_key(granularity, key):
+    return f'ts-bucket:orders:{granularity}:{timezone.get_current_timezone_name()}:{key.isoformat()}'
+
+
+def _bucket_signatures(keys, bounds, granularity):
+    """
+    {llave: firma} de los buckets según sus filas de rollup en la base: cantidad de filas, última
+    escritura (updated_at) y sumas de pedidos, cancelados e ingresos. Toda escritura de un rollup
+    (pedido nuevo, cambio de estado o de total, borrado o recálculo) cambia la firma de su bucket,
+    la haga el worker que la haga. Es un GROUP BY que no lee los sketches.
+    """
+    signatures = {key: None for key in keys}
+    if keys:
+        start, end = bounds[keys[0]][0], bounds[keys[-1]][1]
+        rows = (
+            HourlySalesRollup.objects.filter(hour__gte=hour_bucket(start), hour__lt=end)
+            .annotate(bucket=Trunc('hour', granularity, tzinfo=timezone.get_current_timezone()))
+            .values('bucket')
+            .annotate(
+                rows=Count('id'), updated=Max('updated_at'), orders=Sum('orders_count'),
+                cancelled=Sum('cancelled_count'), revenue=Sum('revenue'),
+            )
+            .order_by('bucket')
+        )
+        for row in rows:
+            key = bucket_key(row['bucket'], granularity)
+            if key in signatures:
+                signatures[key] = (row['rows'], row['updated'], row['orders'], row['cancelled'], row['revenue'])
+    return signatures
+
+
+def _cached_order_metrics(window, compute):
+    """
+    {llave: valor} de los buckets de la ventana con pedidos. Los buckets completos (enteros
+    dentro de la ventana) salen del cache si su firma no cambió desde que se calcularon; el
+    resto se calcula con compute(rangos), que recibe los intervalos [inicio, fin] (fin incluido)
+    a consultar y devuelve {llave: valor} de los que tienen datos.
+    """
+    keys = bucket_keys(window)
+    bounds = {key: bucket_bounds(key, window.granularity) for key in keys}
+    # El bucket abierto termina después de window.end (ahora), así que nunca se cachea
+    complete = [
+        key for key in keys
+        if bounds[key][0] >= window.start and bounds[key][1] - _EPSILON <= window.end
+    ]
+    # Firmas antes de los valores: si algo cambia entre ambas lecturas, la entrada guardada no
+    # coincide con la próxima firma y se recalcula
+    signatures = _bucket_signatures(complete, bounds, window.granularity)
+    cache_keys = {key: _bucket_cache_key(window.granularity, key) for key in complete}
+    stored = cache.get_many(list(cache_keys.values()))
+
+    values = {}
+    for key, cache_key in cache_keys.items():
+        entry = stored.get(cache_key)
+        if entry is not None and entry[0] == signatures[key]:
+            values[key] = entry[1]
+
+    missing = [key for key in keys if key not in values]
+    if missing:
+        # Intervalos contiguos de buckets faltantes, recortados a la ventana
+        ranges = []
+        for key in missing:
+            start, end = max(bounds[key][0], window.start), min(bounds[key][1] - _EPSILON, window.end)
+            if ranges and ranges[-1][1] + _EPSILON == start:
+                ranges[-1] = (ranges[-1][0], end)
+            else:
+                ranges.append((start, end))
+        fresh = compute(ranges)
+        cache.set_many(
+            {cache_keys[key]: (signatures[key], fresh.get(key)) for key in missing if key in cache_keys},
+            settings.DASHBOARD_BUCKET_CACHE_TIMEOUT,
+        )
+        values.update(fresh)
+    return {key: value for key, value in values.items() if value is not None}
+
+
+def _order_metrics(ranges, granularity):
+    buckets = {}
+    sketches = {}
+    in_ranges = Q()
+    for start, end in ranges:
+        in_ranges |= Q(hour__gte=hour_bucket(start), hour__lte=end)
+    rows = (
+        HourlySalesRollup.objects.filter(in_ranges)
+        .order_by('hour')
+        .values_list('hour', 'orders_count', 'cancelled_count', 'revenue', 'customers_sketch')
+    )
+    for hour, orders, cancelled, revenue, sketch in rows:
+        key = bucket_key(hour, granularity)
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = {'orders': 0, 'active_orders': 0, 'revenue': Decimal('0')}
+            sketches[key] = []
+        bucket['orders'] += orders
+        # Agregados condicionales: las filas ya guardan cuántos pedidos se cancelaron y los ingresos sin ellos
+        bucket['active_orders'] += orders - cancelled
+        bucket['revenue'] += revenue
+        sketches[key].append(sketch)
+    for key, bucket in buckets.items():
+        bucket['customers'] = sketch_estimate(sketch_merge(sketches[key]))
+    return buckets
+
+
+def order_metrics(window):
+    """{llave: {'orders', 'active_orders', 'revenue', 'customers'}} de los buckets con pedidos."""
+    return _cached_order_metrics(window, lambda ranges: _order_metrics(ranges, window.granularity))
+
+
+def registrations(window):
+    """{llave: usuarios registrados} de los buckets con registros (un GROUP BY, sin cache)."""
+    rows = (
+        get_user_model().objects.filter(date_joined__gte=window.start, date_joined__lte=window.end)
+        .annotate(bucket=Trunc('date_joined', window.granularity, tzinfo=timezone.get_current_timezone()))
+        .values('bucket')
+        .annotate(count=Count('id'))
+        .order_by('bucket')
+    )
+    return {bucket_key(row['bucket'], window.granularity): row['count'] for row in rows}
+
+
+def series(buckets, window, fill, value, include=None):
+    """
+    [{'date': iso, **value(bucket)}] en orden. Con fill, todas las llaves de la ventana (los buckets
+    sin datos pasan como None); sin fill, solo los buckets para los que include(bucket) es verdadero.
+    """
+    if fill:
+        return [{'date': key.isoformat(), **value(buckets.get(key))} for key in bucket_keys(window)]
+    return [
+        {'date': key.isoformat(), **value(bucket)}
+        for key, bucket in sorted(buckets.items())
+        if include is None or include(bucket)
+    ]
+
+
+def _count(field):
+    return lambda bucket: {'count': bucket[field] if bucket else 0}
+
+
+def _registered(count):
+    return {'count': count or 0}
+
+
+def _revenue(bucket):
+    return {'total': float(bucket['revenue']) if bucket else 0.0}
+
+
+def order_series(window, fill=None):
+    """
+    Series de pedidos, ingresos y clientes, distribución de estados y top productos de la ventana.
+    Por defecto (igual que las consultas originales) se completan los huecos solo por hora; por
+    día o semana se listan únicamente los buckets con pedidos (ingresos: con pedidos no cancelados).
+    """
+    fill = window.granularity == 'hour' if fill is None else fill
+    buckets = order_metrics(window)
+    return {
+        'ordersByDay': series(buckets, window, fill, _count('orders'), lambda b: b['orders']),
+        'revenueByDay': series(buckets, window, fill, _revenue, lambda b: b['active_orders']),
+        'customersByDay': series(buckets, window, fill, _count('customers'), lambda b: b['orders']),
+        'statusDistribution': status_distribution(),
+        'topProducts': [
+            {'product': row['product_name'], 'quantity': int(row['quantity'])}
+            for row in top_products(window.start, window.end)
+        ],
+        'rangeDays': window.days,
+    }
+
+
+def registration_series(window, fill=None):
+    fill = window.granularity == 'hour' if fill is None else fill
+    return series(registrations(window), window, fill, _registered)
+
+
+def dashboard_series(days, now=None):
+    """Series del dashboard para las últimas `days` (1, 7 o 30) con el formato de siempre."""
+    return order_series(last_days(days, now))
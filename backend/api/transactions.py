@@ -0,0 +1,36 @@
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+
+logger = logging.getLogger(__name__)
+
+LOCK_ERRORS = ('database is locked', 'database table is locked', 'database is busy')
+
+
+def is_lock_error(exc):
+    return any(message in str(exc) for message in LOCK_ERRORS)
+
+
+def atomic_with_retry(func, *args, using=None, **kwargs):
+    """
+    Ejecutar func en transaction.atomic(), reintentando si SQLite responde que la base está
+    bloqueada. La espera es aleatoria entre 0 y un tope que se duplica en cada intento (hasta
+    DB_WRITE_RETRY_MAX_DELAY), para que los pedidos que chocaron no vuelvan a chocar juntos.
+
+    Dentro de una transacción ya abierta no se reintenta: el bloqueo deshace la transacción
+    exterior completa y es ella la que debe repetirse.
+    """
+    attempts = 1 if transaction.get_connection(using).in_atomic_block else settings.DB_WRITE_RETRIES + 1
+    for attempt in range(attempts):
+        try:
+            with transaction.atomic(using=using):
+                return func(*args, **kwargs)
+        except OperationalError as exc:
+            if attempt == attempts - 1 or not is_lock_error(exc):
+                raise
+            delay = random.uniform(0, min(settings.DB_WRITE_RETRY_MAX_DELAY, settings.DB_WRITE_RETRY_DELAY * 2 ** attempt))
+            logger.warning('Base bloqueada (intento %d de %d), reintentando en %.3fs', attempt + 1, attempts, delay)
+            time.sleep(delay)
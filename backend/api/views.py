@@ -4,23 +4,35 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework.exceptions import ValidationError  # AGREGAR ESTA LÍNEA
 from rest_framework.authentication import TokenAuthentication, SessionAuthentication
-from django.db.models import Q
-from django.contrib.auth import get_user_model
 from django.utils import timezone
-from datetime import timedelta
-from django.db.models import Count, Sum
-from django.db.models.functions import TruncDate
+from django.db.models import Count, Max
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, urlencode
 from products.models import Category, Product, ProductTag, Ingredient, ProductIngredient
 from .models import HeroSection, AboutSection, ContactInfo, FeaturedProduct, Order, OrderItem, OrderItemExtra, Review, SiteConfig
+from .caching import CachedResponseMixin
+from . import exports
+from .fast_serializers import FastListMixin, serialize_many
+from .catalog import annotate_products_count, with_product_relations
+from .pagination import CreatedAtKeysetPagination, IdKeysetPagination
+from .pricing import get_catalog
+from .replica import analytics_db, use_analytics_db
+from . import timeseries
+from .search import search_product_ids
 from .serializers import (
     CategorySerializer, ProductSerializer, ProductDetailSerializer, ProductTagSerializer,
     HeroSectionSerializer, AboutSectionSerializer, ContactInfoSerializer, FeaturedProductSerializer,
-    IngredientSerializer, ProductIngredientSerializer, OrderSerializer, CreateOrderSerializer, ReviewSerializer, SiteConfigSerializer
+    IngredientSerializer, ProductIngredientSerializer, OrderSerializer, OrderSummarySerializer, CreateOrderSerializer,
+    ReviewSerializer, SiteConfigSerializer, with_order_relations
 )
-from decimal import Decimal
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
 
 class CategoryViewSet(viewsets.ModelViewSet):
-    queryset = Category.objects.all()
+    queryset = annotate_products_count(Category.objects.all())
     serializer_class = CategorySerializer
     
     def get_permissions(self):
@@ -34,13 +46,13 @@ class CategoryViewSet(viewsets.ModelViewSet):
     def products(self, request, pk=None):
         """Obtener todos los productos de una categoría específica"""
         category = self.get_object()
-        products = Product.objects.filter(category=category, is_active=True)
-        serializer = ProductSerializer(products, many=True, context={'request': request})
-        return Response(serializer.data)
+        products = with_product_relations(Product.objects.filter(category=category, is_active=True).order_by('id'))
+        return Response(serialize_many(ProductSerializer, products, {'request': request}))
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(FastListMixin, viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    pagination_class = IdKeysetPagination
     
     def get_permissions(self):
         if self.action in ['list', 'retrieve', 'search', 'featured', 'calculate_price']:
@@ -55,7 +67,10 @@ class ProductViewSet(viewsets.ModelViewSet):
         return ProductSerializer
     
     def get_queryset(self):
-        queryset = Product.objects.filter(is_active=True)
+        queryset = Product.objects.filter(is_active=True).order_by('id')
+        # Solo en lecturas: update() reemplaza tags/ingredientes y no debe ver el cache del prefetch
+        if self.action in ['list', 'retrieve']:
+            queryset = with_product_relations(queryset)
         category = self.request.query_params.get('category', None)
         search = self.request.query_params.get('search', None)
         
@@ -63,11 +78,7 @@ class ProductViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(category__name=category)
         
         if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) | 
-                Q(description__icontains=search) |
-                Q(category__name__icontains=search)
-            )
+            queryset = queryset.filter(id__in=search_product_ids(search))
         
         return queryset
     
@@ -167,41 +178,45 @@ class ProductViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def featured(self, request):
         """Obtener productos destacados (los más recientes)"""
-        featured_products = Product.objects.filter(is_active=True).order_by('-created_at')[:6]
-        serializer = self.get_serializer(featured_products, many=True, context={'request': request})
-        return Response(serializer.data)
+        featured_products = with_product_relations(Product.objects.filter(is_active=True)).order_by('-created_at')[:6]
+        return Response(serialize_many(ProductSerializer, featured_products, self.get_serializer_context()))
     
     @action(detail=False, methods=['get'])
     def search(self, request):
-        """Buscar productos por nombre o descripción"""
+        """Buscar productos por nombre, descripción, categoría o tags (sin tildes y por prefijo)"""
         search_term = request.query_params.get('q', '')
         if not search_term:
             return Response({'error': 'Término de búsqueda requerido'}, status=status.HTTP_400_BAD_REQUEST)
         
-        products = Product.objects.filter(
-            Q(name__icontains=search_term) | 
-            Q(description__icontains=search_term),
-            is_active=True
+        # Resultados ordenados por relevancia según el índice de búsqueda
+        product_ids = search_product_ids(search_term)
+        rank = {product_id: position for position, product_id in enumerate(product_ids)}
+        products = sorted(
+            with_product_relations(Product.objects.filter(id__in=product_ids, is_active=True)),
+            key=lambda product: rank[product.id]
         )
-        serializer = self.get_serializer(products, many=True, context={'request': request})
-        return Response(serializer.data)
+        return Response(serialize_many(ProductSerializer, products, self.get_serializer_context()))
 
     @action(detail=True, methods=['post'])
     def calculate_price(self, request, pk=None):
         """Calcular precio para un producto dado un conjunto de extras (IDs de ingredientes)."""
         try:
-            product = self.get_object()
-        except Product.DoesNotExist:
+            product = get_catalog().get(int(pk), active_only=True)
+        except ValueError:
+            product = None
+        if product is None:
             return Response({'detail': 'Producto no encontrado'}, status=status.HTTP_404_NOT_FOUND)
 
         extra_ids = request.data.get('extra_ids', [])
-        if not isinstance(extra_ids, list):
+        try:
+            if not isinstance(extra_ids, list):
+                raise TypeError
+            ingredient_ids = [int(extra_id) for extra_id in extra_ids]
+        except (TypeError, ValueError):
             return Response({'detail': 'extra_ids debe ser una lista de IDs'}, status=status.HTTP_400_BAD_REQUEST)
 
-        base = Decimal(product.price)
-        extras_qs = product.product_ingredients.filter(default_included=False, is_active=True, ingredient_id__in=extra_ids)
-        extras_total = sum((pi.extra_cost for pi in extras_qs), Decimal('0'))
-        total = base + extras_total
+        # En memoria: el catálogo compilado ya tiene precios y costos extra por ingrediente
+        base, extras_total, total = product.quote(ingredient_ids)
         return Response({
             'base_price': base,
             'extras_total': extras_total,
@@ -232,9 +247,11 @@ class ProductIngredientViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAdminUser]
 
 # Vistas para contenido dinámico
-class HeroSectionViewSet(viewsets.ModelViewSet):
+class HeroSectionViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = HeroSection.objects.filter(is_active=True)
     serializer_class = HeroSectionSerializer
+    cache_actions = ['active']
+    cache_models = [HeroSection]
     
     def get_permissions(self):
         if self.action in ['list', 'retrieve', 'active']:
@@ -252,9 +269,11 @@ class HeroSectionViewSet(viewsets.ModelViewSet):
             return Response(serializer.data)
         return Response({'error': 'No hay sección hero activa'}, status=status.HTTP_404_NOT_FOUND)
 
-class AboutSectionViewSet(viewsets.ModelViewSet):
+class AboutSectionViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = AboutSection.objects.filter(is_active=True)
     serializer_class = AboutSectionSerializer
+    cache_actions = ['active']
+    cache_models = [AboutSection]
     
     def get_permissions(self):
         if self.action in ['list', 'retrieve', 'active']:
@@ -272,9 +291,11 @@ class AboutSectionViewSet(viewsets.ModelViewSet):
             return Response(serializer.data)
         return Response({'error': 'No hay sección about activa'}, status=status.HTTP_404_NOT_FOUND)
 
-class ContactInfoViewSet(viewsets.ModelViewSet):
+class ContactInfoViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = ContactInfo.objects.filter(is_active=True)
     serializer_class = ContactInfoSerializer
+    cache_actions = ['active']
+    cache_models = [ContactInfo]
     
     def get_permissions(self):
         if self.action in ['list', 'retrieve', 'active']:
@@ -292,9 +313,11 @@ class ContactInfoViewSet(viewsets.ModelViewSet):
             return Response(serializer.data)
         return Response({'error': 'No hay información de contacto activa'}, status=status.HTTP_404_NOT_FOUND)
 
-class FeaturedProductViewSet(viewsets.ModelViewSet):
+class FeaturedProductViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = FeaturedProduct.objects.filter(is_active=True)
     serializer_class = FeaturedProductSerializer
+    cache_actions = ['active']
+    cache_models = [FeaturedProduct]
     
     def get_permissions(self):
         if self.action in ['list', 'retrieve', 'active']:
@@ -313,9 +336,10 @@ class FeaturedProductViewSet(viewsets.ModelViewSet):
         return Response({'error': 'No hay producto destacado activo'}, status=status.HTTP_404_NOT_FOUND)
 
 # ViewSet para reseñas
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(FastListMixin, viewsets.ModelViewSet):
     queryset = Review.objects.filter(is_approved=True, is_visible=True)
     serializer_class = ReviewSerializer
+    pagination_class = CreatedAtKeysetPagination
 
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -331,10 +355,11 @@ class ReviewViewSet(viewsets.ModelViewSet):
         if getattr(self, 'action', None) in ['retrieve', 'partial_update', 'update', 'destroy', 'set_visibility'] and user and user.is_staff:
             return Review.objects.all()
 
-        qs = super().get_queryset()
+        # username sale del usuario de cada reseña
+        qs = super().get_queryset().select_related('user')
         include_all = self.request.query_params.get('include_all')
         if include_all in ['1', 'true', 'yes'] and user and user.is_staff:
-            return Review.objects.all()
+            return Review.objects.select_related('user')
         return qs
 
     def perform_create(self, serializer):
@@ -359,9 +384,10 @@ class ReviewViewSet(viewsets.ModelViewSet):
         return Response({'id': review.id, 'is_visible': review.is_visible})
 
 # ViewSet para configuración global del sitio (singleton)
-class SiteConfigViewSet(viewsets.ModelViewSet):
+class SiteConfigViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = SiteConfig.objects.all()
     serializer_class = SiteConfigSerializer
+    cache_models = [SiteConfig]
 
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -386,9 +412,10 @@ class SiteConfigViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 # VIEWSETS PARA PEDIDOS
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(FastListMixin, viewsets.ModelViewSet):
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
+    pagination_class = CreatedAtKeysetPagination
     
     def get_permissions(self):
         # Permisos por acción:
@@ -403,39 +430,40 @@ class OrderViewSet(viewsets.ModelViewSet):
             permission_classes = [IsAdminUser]
         return [permission() for permission in permission_classes]
     
+    def is_summary(self):
+        # ?summary=1 en listados: items sin descripción de producto ni ingredientes
+        return self.action in ['list', 'my'] and self.request.query_params.get('summary') in ['1', 'true', 'yes']
+
     def get_serializer_class(self):
         if self.action == 'create':
             return CreateOrderSerializer
+        if self.is_summary():
+            return OrderSummarySerializer
         return OrderSerializer
     
     def create(self, request, *args, **kwargs):
         """Crear un nuevo pedido"""
-        print("=== DATOS RECIBIDOS EN EL VIEWSET ===")
-        print(f"Request data: {request.data}")
+        logger.debug("Pedido recibido: %s", request.data)
         
         serializer = self.get_serializer(data=request.data)
         
         try:
             serializer.is_valid(raise_exception=True)
-            order = serializer.save()
             # Asociar el usuario autenticado si existe (checkout con usuario)
-            if request.user and request.user.is_authenticated:
-                order.user = request.user
-                order.save()
+            user = request.user if request.user and request.user.is_authenticated else None
+            order = serializer.save(user=user)
             
             # Retornar el pedido creado con el serializer de lectura
             response_serializer = OrderSerializer(order, context={'request': request})
             return Response(response_serializer.data, status=status.HTTP_201_CREATED)
         
         except ValidationError as e:  # CORREGIDO: usar ValidationError directamente
-            print(f"Error de validación: {e}")
-            print(f"Errores del serializer: {serializer.errors}")
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            # e.detail: también los errores que detecta save() (p.ej. un producto recién borrado)
+            logger.info("Pedido rechazado por validación: %s", e.detail)
+            return Response(e.detail, status=status.HTTP_400_BAD_REQUEST)
         
         except Exception as e:
-            print(f"Error inesperado: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Error inesperado al crear el pedido")
             return Response(
                 {'error': f'Error interno del servidor: {str(e)}'}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -443,10 +471,52 @@ class OrderViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def my(self, request):
-        """Listar los pedidos del usuario autenticado"""
-        qs = Order.objects.filter(user=request.user).order_by('-created_at')
-        serializer = OrderSerializer(qs, many=True)
-        return Response(serializer.data)
+        """
+        Listar los pedidos del usuario autenticado. Responde 304 a If-None-Match /
+        If-Modified-Since si ningún pedido cambió, y con ?since=<ISO 8601> devuelve solo
+        los pedidos modificados después de esa fecha.
+        """
+        qs = Order.objects.filter(user=request.user)
+        # Una consulta sobre el índice (user, updated_at); el conteo detecta pedidos borrados
+        state = qs.aggregate(last_modified=Max('updated_at'), count=Count('id'))
+        last_modified = state['last_modified']
+        etag = f'{state["count"]}-{last_modified.timestamp() if last_modified else 0}'
+        if request.query_params:
+            # summary, since y cursor cambian el cuerpo: el validador depende también de la query
+            query = urlencode(sorted(request.query_params.lists()), doseq=True)
+            etag += '-' + hashlib.sha256(query.encode()).hexdigest()[:16]
+        etag = f'W/"{etag}"'
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache', 'Vary': 'Authorization, Cookie'}
+        if last_modified:
+            headers['Last-Modified'] = http_date(last_modified.timestamp())
+
+        if_none_match = request.headers.get('If-None-Match')
+        if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        if if_none_match:
+            not_modified = etag in parse_etags(if_none_match)
+        else:
+            not_modified = bool(last_modified and if_modified_since and int(last_modified.timestamp()) <= if_modified_since)
+        if not_modified:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        since = request.query_params.get('since')
+        if since:
+            since_value = parse_datetime(since)
+            if since_value is None:
+                return Response({'error': 'since debe ser una fecha ISO 8601'}, status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(since_value):
+                since_value = timezone.make_aware(since_value)
+            qs = qs.filter(updated_at__gt=since_value)
+
+        qs = with_order_relations(qs.order_by('-created_at'), summary=self.is_summary())
+        page = self.paginate_queryset(qs)
+        if page is not None:
+            response = self.get_paginated_response(serialize_many(self.get_serializer_class(), page, self.get_serializer_context()))
+        else:
+            response = Response(serialize_many(self.get_serializer_class(), qs, self.get_serializer_context()))
+        for header, value in headers.items():
+            response[header] = value
+        return response
     
     @action(detail=True, methods=['patch'])
     def update_status(self, request, pk=None):
@@ -465,10 +535,35 @@ class OrderViewSet(viewsets.ModelViewSet):
         
         serializer = self.get_serializer(order)
         return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Exportar items de pedidos (CSV o NDJSON) en streaming. ?output=csv|ndjson&since=&until=&status=
+        since y until son fechas locales YYYY-MM-DD, ambas incluidas (como en admin_stats).
+        """
+        # 'format' lo usa DRF para elegir renderer, por eso el parámetro se llama 'output'
+        export_format = request.query_params.get('output', 'csv')
+        if export_format not in exports.EXPORT_FORMATS:
+            return Response({'error': 'output debe ser csv o ndjson'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            start, end = exports.parse_range(request.query_params.get('since'), request.query_params.get('until'))
+            statuses = exports.parse_statuses(request.query_params.get('status'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        content_type = 'text/csv; charset=utf-8' if export_format == 'csv' else 'application/x-ndjson'
+        # El stream se consume después de que la vista retorna: la base se fija aquí y no por el router
+        rows = exports.export_orders(export_format, start, end, statuses, using=analytics_db())
+        response = StreamingHttpResponse(rows, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="pedidos.{export_format}"'
+        return response
     
     def get_queryset(self):
         """Filtrar pedidos por estado si se especifica"""
         queryset = Order.objects.all().order_by('-created_at')
+        if self.action != 'destroy':
+            queryset = with_order_relations(queryset, summary=self.is_summary())
         status_filter = self.request.query_params.get('status', None)
         
         if status_filter:
@@ -477,169 +572,22 @@ class OrderViewSet(viewsets.ModelViewSet):
         return queryset
 
     @action(detail=False, methods=['get'])
+    @use_analytics_db
     def admin_stats(self, request):
-        """Estadísticas para dashboard admin (últimos 30 días). Requiere IsAdminUser por get_permissions."""
-        now = timezone.now()
-        # Permitir filtrar por rango: day (1), week (7), month (30)
-        range_param = (request.query_params.get('range') or '').lower()
-        if range_param == 'day':
-            days = 1
-        elif range_param == 'week':
-            days = 7
-        else:
-            # default month
-            days = 30
-        # Para incluir el día actual, restamos days-1
-        start_date = now - timedelta(days=days - 1)
-
-        # Pedidos: por hora si day, por día en otros rangos
-        if days == 1:
-            from django.db.models.functions import TruncHour
-            # Ventana móvil de últimas 24 horas, terminando en la hora actual
-            current_hour_local = timezone.localtime(now).replace(minute=0, second=0, microsecond=0)
-            start_hour_local = current_hour_local - timedelta(hours=23)
-            # Convertir a UTC (o zona activa) para filtrar correctamente en DB
-            start_dt = timezone.make_aware(start_hour_local.replace(tzinfo=None)) if timezone.is_naive(start_hour_local) else start_hour_local
-            end_dt = timezone.make_aware(current_hour_local.replace(tzinfo=None)) if timezone.is_naive(current_hour_local) else current_hour_local
-
-            ob_qs = (
-                Order.objects.filter(created_at__gte=start_dt, created_at__lte=end_dt)
-                .annotate(hour=TruncHour('created_at'))
-                .values('hour')
-                .annotate(count=Count('id'))
-                .order_by('hour')
-            )
-            # Construir lista por índice 0..23
-            counts = [0] * 24
-            for row in ob_qs:
-                local_hour = timezone.localtime(row['hour']).replace(minute=0, second=0, microsecond=0)
-                idx = int((local_hour - start_hour_local).total_seconds() // 3600)
-                if 0 <= idx < 24:
-                    counts[idx] = int(row['count'] or 0)
-            orders_by_day = [
-                {'date': (start_hour_local + timedelta(hours=i)).isoformat(), 'count': counts[i]}
-                for i in range(24)
-            ]
-        else:
-            orders_by_day_qs = (
-                Order.objects.filter(created_at__date__gte=start_date.date())
-                .annotate(day=TruncDate('created_at'))
-                .values('day')
-                .annotate(count=Count('id'))
-                .order_by('day')
-            )
-            orders_by_day = [{'date': o['day'].isoformat(), 'count': o['count']} for o in orders_by_day_qs]
-
-        # Ingresos: por hora si day, por día en otros rangos (excluye cancelados)
-        if days == 1:
-            from django.db.models.functions import TruncHour
-            current_hour_local = timezone.localtime(now).replace(minute=0, second=0, microsecond=0)
-            start_hour_local = current_hour_local - timedelta(hours=23)
-            start_dt = timezone.make_aware(start_hour_local.replace(tzinfo=None)) if timezone.is_naive(start_hour_local) else start_hour_local
-            end_dt = timezone.make_aware(current_hour_local.replace(tzinfo=None)) if timezone.is_naive(current_hour_local) else current_hour_local
-
-            rbd_qs = (
-                Order.objects.filter(created_at__gte=start_dt, created_at__lte=end_dt)
-                .exclude(status='cancelled')
-                .annotate(hour=TruncHour('created_at'))
-                .values('hour')
-                .annotate(total=Sum('total_amount'))
-                .order_by('hour')
-            )
-            totals = [0.0] * 24
-            for row in rbd_qs:
-                local_hour = timezone.localtime(row['hour']).replace(minute=0, second=0, microsecond=0)
-                idx = int((local_hour - start_hour_local).total_seconds() // 3600)
-                if 0 <= idx < 24:
-                    totals[idx] = float(row['total'] or 0)
-            revenue_by_day = [
-                {'date': (start_hour_local + timedelta(hours=i)).isoformat(), 'total': totals[i]}
-                for i in range(24)
-            ]
-        else:
-            revenue_by_day_qs = (
-                Order.objects.filter(created_at__date__gte=start_date.date())
-                .exclude(status='cancelled')
-                .annotate(day=TruncDate('created_at'))
-                .values('day')
-                .annotate(total=Sum('total_amount'))
-                .order_by('day')
-            )
-            revenue_by_day = [{'date': r['day'].isoformat(), 'total': float(r['total'] or 0)} for r in revenue_by_day_qs]
-
-        # Distribución por estado
-        status_dist_qs = (
-            Order.objects.values('status')
-            .annotate(count=Count('id'))
-            .order_by()
-        )
-        status_distribution = {row['status']: row['count'] for row in status_dist_qs}
-
-        # Top productos por cantidad (últimas 24h si day, si no últimos N días)
-        if days == 1:
-            from django.db.models.functions import TruncHour
-            current_hour_local = timezone.localtime(now).replace(minute=0, second=0, microsecond=0)
-            start_hour_local = current_hour_local - timedelta(hours=23)
-            start_dt = timezone.make_aware(start_hour_local.replace(tzinfo=None)) if timezone.is_naive(start_hour_local) else start_hour_local
-            end_dt = timezone.make_aware(current_hour_local.replace(tzinfo=None)) if timezone.is_naive(current_hour_local) else current_hour_local
-            top_products_qs = (
-                OrderItem.objects.filter(order__created_at__gte=start_dt, order__created_at__lte=end_dt)
-                .values('product_name')
-                .annotate(quantity=Sum('quantity'))
-                .order_by('-quantity')[:5]
-            )
-        else:
-            top_products_qs = (
-                OrderItem.objects.filter(order__created_at__date__gte=start_date.date())
-                .values('product_name')
-                .annotate(quantity=Sum('quantity'))
-                .order_by('-quantity')[:5]
-            )
-        top_products = [{'product': r['product_name'], 'quantity': int(r['quantity'] or 0)} for r in top_products_qs]
-
-        # Usuarios registrados (User.date_joined)
-        User = get_user_model()
-        if days == 1:
-            from django.db.models.functions import TruncHour
-            current_hour_local = timezone.localtime(now).replace(minute=0, second=0, microsecond=0)
-            start_hour_local = current_hour_local - timedelta(hours=23)
-            start_dt = timezone.make_aware(start_hour_local.replace(tzinfo=None)) if timezone.is_naive(start_hour_local) else start_hour_local
-            end_dt = timezone.make_aware(current_hour_local.replace(tzinfo=None)) if timezone.is_naive(current_hour_local) else current_hour_local
-
-            ubd_qs = (
-                User.objects.filter(date_joined__gte=start_dt, date_joined__lte=end_dt)
-                .annotate(hour=TruncHour('date_joined'))
-                .values('hour')
-                .annotate(count=Count('id'))
-                .order_by('hour')
-            )
-            ucounts = [0] * 24
-            for row in ubd_qs:
-                local_hour = timezone.localtime(row['hour']).replace(minute=0, second=0, microsecond=0)
-                idx = int((local_hour - start_hour_local).total_seconds() // 3600)
-                if 0 <= idx < 24:
-                    ucounts[idx] = int(row['count'] or 0)
-            users_by_day = [
-                {'date': (start_hour_local + timedelta(hours=i)).isoformat(), 'count': ucounts[i]}
-                for i in range(24)
-            ]
-        else:
-            ubd_qs = (
-                User.objects.filter(date_joined__date__gte=start_date.date())
-                .annotate(day=TruncDate('date_joined'))
-                .values('day')
-                .annotate(count=Count('id'))
-                .order_by('day')
-            )
-            users_by_day = [{'date': r['day'].isoformat(), 'count': int(r['count'] or 0)} for r in ubd_qs]
-
+        """Estadísticas para dashboard admin (?range=day|week|month o ?since=&until=). Requiere IsAdminUser por get_permissions."""
+        try:
+            window = timeseries.window_from_params(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        # Pedidos, ingresos (sin cancelados), estados y top productos desde los rollups por hora
+        series = timeseries.order_series(window)
         return Response({
-            'ordersByDay': orders_by_day,
-            'revenueByDay': revenue_by_day,
-            'statusDistribution': status_distribution,
-            'topProducts': top_products,
-            'usersByDay': users_by_day,
-            'rangeDays': days,
+            'ordersByDay': series['ordersByDay'],
+            'revenueByDay': series['revenueByDay'],
+            'statusDistribution': series['statusDistribution'],
+            'topProducts': series['topProducts'],
+            'usersByDay': timeseries.registration_series(window),
+            'rangeDays': window.days,
         })
 
 # ViewSet de usuarios para estadísticas dedicadas
@@ -647,52 +595,11 @@ class UserViewSet(viewsets.ViewSet):
     permission_classes = [IsAdminUser]
 
     @action(detail=False, methods=['get'], url_path='stats')
+    @use_analytics_db
     def stats(self, request):
         """Usuarios registrados agrupados por hora (día) o por día (semana/mes)."""
-        now = timezone.now()
-        range_param = (request.query_params.get('range') or '').lower()
-        if range_param == 'day':
-            days = 1
-        elif range_param == 'week':
-            days = 7
-        else:
-            days = 30
-
-        start_date = now - timedelta(days=days - 1)
-        User = get_user_model()
-
-        if days == 1:
-            from django.db.models.functions import TruncHour
-            current_hour_local = timezone.localtime(now).replace(minute=0, second=0, microsecond=0)
-            start_hour_local = current_hour_local - timedelta(hours=23)
-            start_dt = timezone.make_aware(start_hour_local.replace(tzinfo=None)) if timezone.is_naive(start_hour_local) else start_hour_local
-            end_dt = timezone.make_aware(current_hour_local.replace(tzinfo=None)) if timezone.is_naive(current_hour_local) else current_hour_local
-
-            qs = (
-                User.objects.filter(date_joined__gte=start_dt, date_joined__lte=end_dt)
-                .annotate(hour=TruncHour('date_joined'))
-                .values('hour')
-                .annotate(count=Count('id'))
-                .order_by('hour')
-            )
-            counts = [0] * 24
-            for row in qs:
-                local_hour = timezone.localtime(row['hour']).replace(minute=0, second=0, microsecond=0)
-                idx = int((local_hour - start_hour_local).total_seconds() // 3600)
-                if 0 <= idx < 24:
-                    counts[idx] = int(row['count'] or 0)
-            users_by_day = [
-                {'date': (start_hour_local + timedelta(hours=i)).isoformat(), 'count': counts[i]}
-                for i in range(24)
-            ]
-        else:
-            qs = (
-                User.objects.filter(date_joined__date__gte=start_date.date())
-                .annotate(day=TruncDate('date_joined'))
-                .values('day')
-                .annotate(count=Count('id'))
-                .order_by('day')
-            )
-            users_by_day = [{'date': r['day'].isoformat(), 'count': int(r['count'] or 0)} for r in qs]
-
-        return Response({'usersByDay': users_by_day, 'rangeDays': days})
+        try:
+            window = timeseries.window_from_params(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'usersByDay': timeseries.registration_series(window), 'rangeDays': window.days})
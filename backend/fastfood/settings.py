@@ -83,12 +83,59 @@ WSGI_APPLICATION = 'fastfood.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# DB_SQLITE_TUNED=1 usa api.sqlite_backend: mmap, busy_timeout y BEGIN IMMEDIATE para que
+# las escrituras concurrentes esperen su turno en vez de fallar con "database is locked".
+DB_SQLITE_TUNED = os.environ.get('DB_SQLITE_TUNED', '1') == '1'
+# DB_SQLITE_WAL=1 (producción) agrega journal_mode=WAL (lectores no bloquean al que escribe) y
+# synchronous=NORMAL. WAL queda grabado en el archivo y crea -wal/-shm al lado, por eso no se
+# activa por defecto: la base de desarrollo db.sqlite3 está versionada en git.
+DB_SQLITE_WAL = os.environ.get('DB_SQLITE_WAL', '0') == '1'
+# Milisegundos que una escritura espera el lock antes de fallar
+DB_BUSY_TIMEOUT = int(os.environ.get('DB_BUSY_TIMEOUT', '5000'))
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'ENGINE': 'api.sqlite_backend' if DB_SQLITE_TUNED else 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+        # Conexiones persistentes por worker, verificadas antes de reutilizarse
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': DB_BUSY_TIMEOUT / 1000,
+        },
     }
 }
+if DB_SQLITE_TUNED:
+    DATABASES['default']['OPTIONS'].update({
+        'transaction_mode': 'IMMEDIATE',
+        'pragmas': {
+            'busy_timeout': DB_BUSY_TIMEOUT,
+            'mmap_size': int(os.environ.get('DB_MMAP_SIZE', str(256 * 1024 * 1024))),
+            'temp_store': 'MEMORY',
+        },
+    })
+    if DB_SQLITE_WAL:
+        DATABASES['default']['OPTIONS']['pragmas'].update({'journal_mode': 'WAL', 'synchronous': 'NORMAL'})
+# Réplica de lectura para dashboard, estadísticas y exportaciones (api/replica.py): copia de
+# la primaria refrescada con `manage.py refresh_replica`. Si su copia tiene más de
+# DB_REPLICA_MAX_STALENESS segundos, o no existe, esas lecturas vuelven a la primaria.
+DB_REPLICA_NAME = os.environ.get('DB_REPLICA_NAME', '')
+DB_REPLICA_MAX_STALENESS = int(os.environ.get('DB_REPLICA_MAX_STALENESS', '300'))
+if DB_REPLICA_NAME:
+    DATABASES['replica'] = {
+        'ENGINE': DATABASES['default']['ENGINE'],
+        'NAME': DB_REPLICA_NAME,
+        'CONN_MAX_AGE': DATABASES['default']['CONN_MAX_AGE'],
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {'timeout': DB_BUSY_TIMEOUT / 1000},
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['api.replica.AnalyticsRouter']
+
+# Reintentos de transacciones de escritura bloqueadas (api/transactions.py): cantidad y
+# segundos de espera base y máxima (backoff exponencial con jitter)
+DB_WRITE_RETRIES = int(os.environ.get('DB_WRITE_RETRIES', '5'))
+DB_WRITE_RETRY_DELAY = float(os.environ.get('DB_WRITE_RETRY_DELAY', '0.05'))
+DB_WRITE_RETRY_MAX_DELAY = float(os.environ.get('DB_WRITE_RETRY_MAX_DELAY', '1.0'))
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -128,6 +175,87 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Los archivos subidos llevan un hash del contenido en el nombre (api/storage.py), lo que
+# permite servirlos con caché inmutable
+MEDIA_HASHED_FILENAMES = os.environ.get('MEDIA_HASHED_FILENAMES', '1') == '1'
+STORAGES = {
+    'default': {
+        'BACKEND': 'api.storage.HashedFileSystemStorage' if MEDIA_HASHED_FILENAMES
+        else 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+# Servir MEDIA_URL desde Django (api/media.py): ETag, Last-Modified y Range
+MEDIA_SERVE = os.environ.get('MEDIA_SERVE', '1') == '1'
+# Transferencia delegada al servidor de adelante: '' (FileResponse), 'x-accel-redirect' (nginx) o 'x-sendfile'
+MEDIA_SENDFILE = os.environ.get('MEDIA_SENDFILE', '')
+# Location interna de nginx con alias a MEDIA_ROOT, usada con x-accel-redirect
+MEDIA_ACCEL_REDIRECT_PREFIX = os.environ.get('MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+
+# Cache
+# API_CACHE_BACKEND=locmem (por proceso, por defecto) o file (compartido entre workers
+# de gunicorn en la misma máquina, en API_CACHE_DIR).
+API_CACHE_BACKEND = os.environ.get('API_CACHE_BACKEND', 'locmem')
+if API_CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('API_CACHE_DIR', os.path.join(BASE_DIR, '.cache')),
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'fastfood',
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        }
+    }
+
+# Segundos que viven una respuesta cacheada por CachedResponseMixin, el conteo de productos por
+# categoría y la versión del snapshot del menú (además de la invalidación por señales, que con locmem solo llega al worker que escribió)
+API_CACHE_TIMEOUT = int(os.environ.get('API_CACHE_TIMEOUT', '300'))
+
+# Paginación por cursor (api/pagination.py) de pedidos, reseñas y productos.
+# Con API_PAGINATION_LEGACY=1 los listados siguen devolviendo la lista completa salvo que
+# el cliente envíe ?cursor= o ?page_size=; con 0 siempre se pagina.
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', '50'))
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', '200'))
+API_PAGINATION_LEGACY = os.environ.get('API_PAGINATION_LEGACY', '1') == '1'
+
+# Eventos de pedidos en vivo (api/events.py). El broker en memoria solo reparte dentro
+# de un proceso; con varios workers apuntar a un broker compartido con la misma interfaz.
+ORDER_EVENTS_BROKER = os.environ.get('ORDER_EVENTS_BROKER', 'api.events.InProcessBroker')
+# Segundos sin eventos tras los cuales se envía un keepalive por el stream
+ORDER_EVENTS_KEEPALIVE = int(os.environ.get('ORDER_EVENTS_KEEPALIVE', '15'))
+
+# Listados de productos, pedidos y reseñas con los serializers rápidos de api/fast_serializers.py
+# (mismo JSON que los de DRF, sin su costo por campo)
+API_FAST_SERIALIZERS = os.environ.get('API_FAST_SERIALIZERS', '0') == '1'
+
+# Generar variantes de imágenes (api/images.py) en un hilo de fondo; con 0 se generan al confirmar el guardado
+IMAGE_VARIANTS_ASYNC = os.environ.get('IMAGE_VARIANTS_ASYNC', '1') == '1'
+
+# Segundos que se guardan los buckets completos de las series del dashboard (api/timeseries.py).
+# La vigencia se verifica contra los rollups en la base en cada consulta; el plazo solo limita la memoria
+DASHBOARD_BUCKET_CACHE_TIMEOUT = int(os.environ.get('DASHBOARD_BUCKET_CACHE_TIMEOUT', '600'))
+
+# Búsqueda de productos: 'auto' usa FTS5 si la tabla existe, 'python' fuerza el índice en memoria
+PRODUCT_SEARCH_BACKEND = os.environ.get('PRODUCT_SEARCH_BACKEND', 'auto')
+
+# Cache en memoria de tokens resueltos (api/auth_backends.py): máximo de entradas y segundos
+# de vida. Se invalida al cerrar sesión o modificar el usuario en el mismo proceso; en los
+# demás workers el TTL acota cuánto sigue valiendo. Con 0 se desactiva.
+AUTH_TOKEN_CACHE_SIZE = int(os.environ.get('AUTH_TOKEN_CACHE_SIZE', '1024'))
+AUTH_TOKEN_CACHE_TTL = int(os.environ.get('AUTH_TOKEN_CACHE_TTL', '60'))
+
+# Catálogo de precios compilado en memoria (api/pricing.py): segundos entre verificaciones de su
+# versión en la base (los cambios de otros workers se ven a más tardar entonces) y edad máxima
+# tras la cual se recompila aunque la versión no haya cambiado
+PRICING_CATALOG_CHECK_INTERVAL = float(os.environ.get('PRICING_CATALOG_CHECK_INTERVAL', '2'))
+PRICING_CATALOG_MAX_AGE = int(os.environ.get('PRICING_CATALOG_MAX_AGE', '300'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -143,4 +271,57 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'COERCE_DECIMAL_TO_STRING': False,  # Enviar Decimals como números en JSON
+    # JSON con orjson si está instalado (api/renderers.py), misma salida que el renderer de DRF
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# Backend de JSON para api.renderers: 'auto' (orjson si está instalado), 'orjson' o 'stdlib'
+API_JSON_BACKEND = os.environ.get('API_JSON_BACKEND', 'auto')
+
+# Logging
+# Los registros pasan por una cola (QueueLogHandler) para no bloquear el request con I/O
+# a stdout. Niveles por logger configurables por entorno, p.ej. API_LOG_LEVEL=DEBUG.
+API_LOG_LEVEL = os.environ.get('API_LOG_LEVEL', 'INFO')
+LOG_LEVELS = {
+    'api.views': os.environ.get('API_VIEWS_LOG_LEVEL', API_LOG_LEVEL),
+    'api.serializers': os.environ.get('API_SERIALIZERS_LOG_LEVEL', API_LOG_LEVEL),
+}
+
+# Fracción de registros DEBUG (payloads de pedidos) que se escriben cuando el nivel DEBUG está habilitado
+LOG_DEBUG_SAMPLE_RATE = float(os.environ.get('LOG_DEBUG_SAMPLE_RATE', '0.1'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'verbose': {
+            'format': '%(asctime)s %(levelname)s %(name)s %(message)s',
+        },
+    },
+    'filters': {
+        'sample_debug': {
+            '()': 'api.log_handlers.SampledDebugFilter',
+            'rate': LOG_DEBUG_SAMPLE_RATE,
+        },
+    },
+    'handlers': {
+        'queue': {
+            '()': 'api.log_handlers.QueueLogHandler',
+            'stream': 'ext://sys.stderr',
+            'formatter': 'verbose',
+            'filters': ['sample_debug'],
+        },
+    },
+    'loggers': {
+        'api': {'handlers': ['queue'], 'level': API_LOG_LEVEL, 'propagate': False},
+        **{name: {'level': level} for name, level in LOG_LEVELS.items()},
+    },
 }
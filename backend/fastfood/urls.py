@@ -15,9 +15,10 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+import re
+
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
 from rest_framework.routers import DefaultRouter
 from api.views import (
     CategoryViewSet, ProductViewSet, ProductTagViewSet,
@@ -26,6 +27,10 @@ from api.views import (
 )
 from api.auth import login_view, logout_view, register_view
 from api.admin_dashboard import dashboard_data
+from api.menu_snapshot import menu_snapshot
+from api.caching import cache_stats
+from api.events import order_events
+from api.media import serve_media
 
 router = DefaultRouter()
 router.register(r'categories', CategoryViewSet)
@@ -45,8 +50,17 @@ router.register(r'users', UserViewSet, basename='users')
 urlpatterns = [
     path('admin/dashboard-data/', dashboard_data, name='admin-dashboard-data'),
     path('admin/', admin.site.urls),
+    path('api/orders/events/', order_events, name='order-events'),
+    path('api/menu/snapshot/', menu_snapshot, name='menu-snapshot'),
+    path('api/cache/stats/', cache_stats, name='cache-stats'),
     path('api/', include(router.urls)),
     path('api/auth/login/', login_view, name='login'),
     path('api/auth/logout/', logout_view, name='logout'),
     path('api/auth/register/', register_view, name='register'),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+]
+
+# Media con caché y Range (api/media.py); desactivar si el servidor de adelante sirve MEDIA_ROOT directamente
+if settings.MEDIA_SERVE:
+    urlpatterns.append(
+        re_path(r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')), serve_media, name='media')
+    )
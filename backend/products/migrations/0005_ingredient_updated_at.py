@@ -0,0 +1,23 @@
+# Generated by Django 5.0.2 on 2026-10-17 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='productingredient',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -13,10 +13,21 @@ class Product(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products')
     image = models.ImageField(upload_to='products/', blank=True, null=True)
+    # Variantes reducidas generadas por api/images.py: {'source': archivo, 'widths': {variante: ancho}, 'files': {variante: {formato: archivo}}}
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # Índices parciales sobre productos activos (is_active=True se compila como "WHERE is_active")
+            # Menú filtrado por categoría
+            models.Index(fields=['category'], condition=models.Q(is_active=True), name='product_active_category_idx'),
+            # Productos destacados (más recientes)
+            models.Index(fields=['-created_at'], condition=models.Q(is_active=True), name='product_active_created_idx'),
+        ]
+    
     def __str__(self):
         return self.name
 
@@ -31,6 +42,7 @@ class ProductTag(models.Model):
 class Ingredient(models.Model):
     name = models.CharField(max_length=100, unique=True)
     is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self) -> str:
         return self.name
@@ -41,6 +53,7 @@ class ProductIngredient(models.Model):
     default_included = models.BooleanField(default=True)
     extra_cost = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('product', 'ingredient')
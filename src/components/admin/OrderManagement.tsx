@@ -13,7 +13,7 @@ import {
   Calendar,
   DollarSign
 } from 'lucide-react';
-import { getOrders, updateOrderStatus, Order } from '../../services/api';
+import { getOrders, getOrder, updateOrderStatus, subscribeOrderEvents, Order } from '../../services/api';
 
 const OrderManagement: React.FC = () => {
   const [orders, setOrders] = useState<Order[]>([]);
@@ -28,6 +28,23 @@ const OrderManagement: React.FC = () => {
     loadOrders();
   }, []);
 
+  // Pedidos nuevos y cambios de estado en vivo para cocina (sin recargar la lista)
+  useEffect(() => {
+    return subscribeOrderEvents(
+      async (event) => {
+        if (event.type === 'order.created' && event.order.id) {
+          const order = await getOrder(event.order.id);
+          setOrders(prev => (prev.some(o => o.id === order.id) ? prev : [order, ...prev]));
+          return;
+        }
+        setOrders(prev => prev.map(o => (
+          o.id === event.order.id ? { ...o, status: event.order.status, updated_at: event.order.updated_at } : o
+        )));
+      },
+      () => console.warn('Eventos de pedidos no disponibles; la lista no se actualizará sola'),
+    );
+  }, []);
+
   const loadOrders = async () => {
     try {
       setIsLoading(true);
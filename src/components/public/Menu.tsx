@@ -322,7 +322,15 @@ export default function Menu() {
               >
                 <div className="relative overflow-hidden">
                   {product.image_url || product.image ? (
-                    <img src={product.image_url || product.image} alt={product.name} className="w-full h-48 object-cover group-hover:scale-110 transition-transform duration-300" />
+                    <picture>
+                      {product.image_srcset && (
+                        <>
+                          <source type="image/webp" srcSet={product.image_srcset.webp} sizes="(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw" />
+                          <source type="image/jpeg" srcSet={product.image_srcset.jpeg} sizes="(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw" />
+                        </>
+                      )}
+                      <img src={product.image_url || product.image} alt={product.name} loading="lazy" className="w-full h-48 object-cover group-hover:scale-110 transition-transform duration-300" />
+                    </picture>
                   ) : (
                     <div className="w-full h-48 bg-gray-100 flex items-center justify-center group-hover:bg-gray-200 transition-colors duration-300">
                       <div className="text-center text-gray-400">
@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from 'react';
-import { getMyOrders, Order, createReview } from '../services/api';
+import { getMyOrders, Order, createReview, subscribeOrderEvents } from '../services/api';
 import { useAuth } from '../context/AuthContext';
 import { Link, useNavigate } from 'react-router-dom';
 import { useToast } from '../context/ToastContext';
@@ -20,9 +20,11 @@ export default function MyOrders() {
   const [reviewComment, setReviewComment] = useState('');
   const [submittingReview, setSubmittingReview] = useState(false);
 
-  // Cargar pedidos y activar polling para actualizaciones de estado
+  // Cargar pedidos y escuchar cambios de estado en vivo (SSE); si el stream no está
+  // disponible se vuelve al polling cada 8 segundos
   useEffect(() => {
     let intervalId: number | undefined;
+    let unsubscribe: (() => void) | undefined;
 
     const fetchOrders = async () => {
       if (!isLoggedIn) return;
@@ -36,11 +38,24 @@ export default function MyOrders() {
 
     if (isLoggedIn) {
       void fetchOrders();
-      // Polling cada 8 segundos para status en "tiempo real"
-      intervalId = window.setInterval(fetchOrders, 8000);
+      unsubscribe = subscribeOrderEvents(
+        (event) => {
+          if (event.type === 'order.created') {
+            void fetchOrders();
+            return;
+          }
+          setOrders(prev => prev.map(o => (
+            o.id === event.order.id ? { ...o, status: event.order.status, updated_at: event.order.updated_at } : o
+          )));
+        },
+        () => {
+          if (!intervalId) intervalId = window.setInterval(fetchOrders, 8000);
+        },
+      );
     }
 
     return () => {
+      unsubscribe?.();
       if (intervalId) window.clearInterval(intervalId);
     };
   }, [isLoggedIn]);
@@ -49,6 +49,11 @@ export interface ProductIngredient {
   is_active: boolean;
 }
 
+export interface ImageSrcset {
+  webp: string;
+  jpeg: string;
+}
+
 export interface Product {
   id: number;
   name: string;
@@ -59,6 +64,7 @@ export interface Product {
   category_icon: string;
   image: string;
   image_url: string;
+  image_srcset?: ImageSrcset | null; // variantes WebP/JPEG (null mientras se generan)
   is_active: boolean;
   tags: ProductTag[];
   product_ingredients?: ProductIngredient[]; // NUEVO
@@ -170,12 +176,12 @@ export interface OrderItem {
   id: number;
   product: number;
   product_name: string;
-  product_description: string;
+  product_description?: string;  // No viene en el resumen (?summary=1)
   quantity: number;
   unit_price: number;
   total_price: number;
   extras: OrderItemExtra[];
-  ingredients: OrderItemIngredient[];  // Nuevo campo
+  ingredients?: OrderItemIngredient[];  // No viene en el resumen (?summary=1)
 }
 
 // Definición única de Order alineada con OrderSerializer del backend
@@ -736,7 +742,8 @@ export const getMyOrders = async (): Promise<Order[]> => {
     await demo.delay();
     return demo.listMyOrders();
   }
-  const response = await api.get('/orders/my/');
+  // Resumen: MisPedidos no muestra descripción de producto ni ingredientes por item
+  const response = await api.get('/orders/my/', { params: { summary: 1 } });
   return response.data;
 };
 
@@ -769,4 +776,42 @@ export const deleteOrder = async (id: number): Promise<boolean> => {
   }
   await api.delete(`/orders/${id}/`);
   return true;
-};
\ No newline at end of file
+};
+
+export interface OrderEvent {
+  type: 'order.created' | 'order.status';
+  order: Pick<Order, 'id' | 'order_number' | 'status' | 'customer_name' | 'total_amount' | 'created_at' | 'updated_at'>;
+}
+
+// Suscripción al stream SSE de pedidos. Se usa fetch en lugar de EventSource para poder
+// enviar el header Authorization. onError se llama si el stream no está disponible o se
+// corta (p.ej. servidor sin ASGI), para que la vista vuelva al polling.
+export const subscribeOrderEvents = (onEvent: (event: OrderEvent) => void, onError: () => void): (() => void) => {
+  const controller = new AbortController();
+  if (DEMO_MODE) {
+    onError();
+    return () => controller.abort();
+  }
+  const run = async () => {
+    const response = await fetch(`${API_URL}/orders/events/`, { headers: getAuthHeader(), signal: controller.signal });
+    if (!response.ok || !response.body) throw new Error(`HTTP ${response.status}`);
+    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffer = '';
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) throw new Error('Stream cerrado');
+      buffer += value;
+      let end;
+      while ((end = buffer.indexOf('\n\n')) >= 0) {
+        const frame = buffer.slice(0, end);
+        buffer = buffer.slice(end + 2);
+        const data = frame.split('\n').filter(line => line.startsWith('data: ')).map(line => line.slice(6)).join('\n');
+        if (data) onEvent(JSON.parse(data));
+      }
+    }
+  };
+  run().catch(() => {
+    if (!controller.signal.aborted) onError();
+  });
+  return () => controller.abort();
+};